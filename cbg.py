@@ -2,16 +2,11 @@
 from __future__ import annotations
 
 import argparse
-import json
+import sys
 from pathlib import Path
 
-from codebasegpt.ai import answer_question
-from codebasegpt.docs import generate_architecture_doc
-from codebasegpt.eval import run_eval_suite
-from codebasegpt.graph import callers_of, connect, impacts_of
-from codebasegpt.indexer import index_repository
-from codebasegpt.migration import generate_migration_guide
-from codebasegpt.pr_review import summarize_pr_impact
+# Subcommands import their codebasegpt modules lazily so that e.g. query-callers does not
+# pay for the AST indexer or the HTTP client at startup.
 
 
 def default_db(repo: Path) -> Path:
@@ -19,9 +14,12 @@ def default_db(repo: Path) -> Path:
 
 
 def cmd_index(args: argparse.Namespace) -> int:
+    from codebasegpt.indexer import INDEX_BATCH_ROWS, index_repository
+
     repo = Path(args.repo).resolve()
     db = Path(args.db).resolve() if args.db else default_db(repo)
-    stats = index_repository(repo, db, reset=not args.incremental)
+    batch_size = args.batch_size if args.batch_size is not None else INDEX_BATCH_ROWS
+    stats = index_repository(repo, db, reset=not args.incremental, batch_size=batch_size, workers=args.workers)
     print(f"Indexed repo: {repo}")
     print(f"DB: {db}")
     print(f"Files={stats['files']} Symbols={stats['symbols']} Relations={stats['relations']}")
@@ -29,24 +27,31 @@ def cmd_index(args: argparse.Namespace) -> int:
 
 
 def cmd_callers(args: argparse.Namespace) -> int:
-    conn = connect(Path(args.db).resolve())
+    from codebasegpt.graph import cached_connection, callers_of
+
+    conn = cached_connection(Path(args.db).resolve())
     rows = callers_of(conn, args.symbol)
-    for row in rows:
-        print(f"{row['path']}:{row['lineno']} caller={row['caller']}")
-    if not rows:
+    if rows:
+        sys.stdout.write("".join(f"{row['path']}:{row['lineno']} caller={row['caller']}\n" for row in rows))
+    else:
         print("No callers found.")
-    conn.close()
     return 0
 
 
 def cmd_impacts(args: argparse.Namespace) -> int:
-    conn = connect(Path(args.db).resolve())
+    from codebasegpt.graph import cached_connection, impacts_of
+
+    conn = cached_connection(Path(args.db).resolve())
     rows = impacts_of(conn, args.symbol)
-    for row in rows:
-        print(f"{row['path']}:{row['lineno']} type={row['relation_type']} dependent={row['dependent']}")
-    if not rows:
+    if rows:
+        sys.stdout.write(
+            "".join(
+                f"{row['path']}:{row['lineno']} type={row['relation_type']} dependent={row['dependent']}\n"
+                for row in rows
+            )
+        )
+    else:
         print("No impacts found.")
-    conn.close()
     return 0
 
 
@@ -55,27 +60,36 @@ def cmd_ask(args: argparse.Namespace) -> int:
     repo = Path(args.repo).resolve() if args.repo else None
     if args.json:
         from codebasegpt.ai import answer_question_with_metadata
+        from codebasegpt.ops import dumps_json
 
         out = answer_question_with_metadata(db, args.question, use_llm=args.llm, model=args.model, repo_path=repo)
-        print(json.dumps(out, indent=2))
+        print(dumps_json(out, indent=True).decode("utf-8"))
     else:
+        from codebasegpt.ai import answer_question
+
         print(answer_question(db, args.question, use_llm=args.llm, model=args.model, repo_path=repo))
     return 0
 
 
 def cmd_docs(args: argparse.Namespace) -> int:
+    from codebasegpt.docs import generate_architecture_doc
+
     out = generate_architecture_doc(Path(args.db).resolve(), Path(args.out).resolve())
     print(f"Wrote: {out}")
     return 0
 
 
 def cmd_pr_impact(args: argparse.Namespace) -> int:
+    from codebasegpt.pr_review import summarize_pr_impact
+
     text = summarize_pr_impact(Path(args.repo).resolve(), Path(args.db).resolve(), args.base, args.head)
     print(text)
     return 0
 
 
 def cmd_migration(args: argparse.Namespace) -> int:
+    from codebasegpt.migration import generate_migration_guide
+
     text = generate_migration_guide(Path(args.repo).resolve(), args.from_ref, args.to_ref)
     print(text)
     return 0
@@ -87,16 +101,20 @@ def cmd_migration(args: argparse.Namespace) -> int:
 
 
 def cmd_eval(args: argparse.Namespace) -> int:
+    from codebasegpt.eval import run_eval_suite
+    from codebasegpt.ops import dumps_json
+
     result = run_eval_suite(
         db_path=Path(args.db).resolve(),
         dataset_path=Path(args.dataset).resolve(),
         use_llm=args.llm,
         model=args.model,
+        workers=args.workers,
     )
     if args.min_confidence is not None:
         low = [c for c in result.get("per_case", []) if float(c.get("confidence", 0.0)) < args.min_confidence]
         result["below_min_confidence"] = len(low)
-    print(json.dumps(result, indent=2))
+    print(dumps_json(result, indent=True).decode("utf-8"))
     return 0
 
 def build_parser() -> argparse.ArgumentParser:
@@ -106,7 +124,13 @@ def build_parser() -> argparse.ArgumentParser:
     p = sub.add_parser("index", help="Index repository")
     p.add_argument("repo")
     p.add_argument("--db")
-    p.add_argument("--incremental", action="store_true")
+    p.add_argument("--incremental", action="store_true", help="Re-parse only files changed since the last index")
+    p.add_argument(
+        "--batch-size",
+        type=int,
+        help="Rows written per transaction while indexing (default: 10000)",
+    )
+    p.add_argument("--workers", type=int, help="Parser processes for large repos (default: CPU count)")
     p.set_defaults(func=cmd_index)
 
     q = sub.add_parser("query-callers", help="Find callers of symbol")
@@ -136,6 +160,7 @@ def build_parser() -> argparse.ArgumentParser:
     ev.add_argument("--llm", action="store_true")
     ev.add_argument("--model")
     ev.add_argument("--min-confidence", type=float, help="Optional threshold for low-confidence count")
+    ev.add_argument("--workers", type=int, help="Concurrent questions (default: 8 with --llm, otherwise 1)")
     ev.set_defaults(func=cmd_eval)
 
     docs = sub.add_parser("generate-docs", help="Generate architecture docs")
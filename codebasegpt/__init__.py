@@ -4,4 +4,11 @@ __all__ = [
     "index_repository",
 ]
 
-from .indexer import index_repository
+
+def __getattr__(name: str):
+    # Resolved lazily so importing a submodule (e.g. codebasegpt.graph) skips the indexer.
+    if name == "index_repository":
+        from .indexer import index_repository
+
+        return index_repository
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
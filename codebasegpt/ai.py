@@ -1,14 +1,33 @@
 from __future__ import annotations
 
-import json
+import functools
+import itertools
 import os
 import re
-import urllib.request
+import sqlite3
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
 from pathlib import Path
+from typing import TYPE_CHECKING, Sequence
 
 from . import graph
-from .ops import append_jsonl, detect_policy_flags, guardrail_settings, load_codeowners, redact_pii, suggest_owners
+from .ops import (
+    detect_policy_flags,
+    dumps_json,
+    enqueue_jsonl,
+    guardrail_settings,
+    load_codeowners,
+    loads_json,
+    redact_pii,
+    suggest_owners,
+)
+
+if TYPE_CHECKING:
+    import http.client
+    import urllib.parse
+
+    from .prompt_cache import PromptCache
 
 
 QUESTION_PATTERNS = {
@@ -33,9 +52,100 @@ STOPWORDS = {
     "this",
 }
 
+_STOPWORDS = frozenset(STOPWORDS)
+_TOKEN_RE = re.compile(r"[a-zA-Z_][a-zA-Z0-9_]{2,}")
+_WORD_RE = re.compile(r"\w+")
+
+
+MAX_TERMS = 10
+
+# Trigram FTS keeps the old substring semantics (every term is >= 3 chars) for candidate
+# lookup; ranking scores each term in SQL (2 for a symbol-name hit, 1 for a path hit),
+# boosts flow edges, then falls back to bm25. The statement always has MAX_TERMS score
+# slots so its text is stable and SQLite's prepared-statement cache is reused.
+_EVIDENCE_SQL = f"""
+SELECT f.path, s.name AS symbol, s.kind,
+       COALESCE(r.relation_type, 'declares') AS relation_type,
+       COALESCE(r.lineno, s.lineno) AS lineno
+FROM search_idx
+JOIN symbols s ON s.id = search_idx.rowid
+JOIN files f ON f.id = s.file_id
+-- One representative inbound edge per symbol (flow edges first) instead of
+-- fanning out to every relation that names it.
+LEFT JOIN relations r ON r.id = (
+    SELECT r2.id
+    FROM relations r2
+    WHERE r2.dst_symbol_name = s.name
+    ORDER BY r2.relation_type IN ('calls', 'imports') DESC, r2.lineno
+    LIMIT 1
+)
+WHERE search_idx MATCH ?
+ORDER BY ({" + ".join(["(CASE WHEN instr(s.name_lc, ?) > 0 THEN 2 WHEN instr(f.path_lc, ?) > 0 THEN 1 ELSE 0 END)"] * MAX_TERMS)}
+          + CASE WHEN r.relation_type IN ('calls', 'imports') THEN 2 ELSE 0 END) DESC,
+         bm25(search_idx, 2.0, 1.0),
+         f.path
+LIMIT ?
+"""
+
+_LEGACY_EVIDENCE_SQL = """
+SELECT f.path, s.name AS symbol, s.kind,
+       COALESCE(r.relation_type, 'declares') AS relation_type,
+       COALESCE(r.lineno, s.lineno) AS lineno
+FROM symbols s
+JOIN files f ON f.id = s.file_id
+LEFT JOIN relations r ON r.dst_symbol_name = s.name
+WHERE {clauses}
+ORDER BY f.path
+LIMIT ?
+"""
+
+_LISTING_SQL = """
+SELECT f.path, s.name AS symbol, s.kind, ? AS relation_type, s.lineno AS lineno
+FROM symbols s
+JOIN files f ON f.id = s.file_id
+ORDER BY s.name
+LIMIT ?
+"""
+
+
+def _build_topic_matcher() -> tuple[re.Pattern[str], dict[str, list[str]]]:
+    keyword_topics: dict[str, list[str]] = {}
+    for topic, keywords in QUESTION_PATTERNS.items():
+        for kw in keywords:
+            keyword_topics.setdefault(kw, []).append(topic)
+    # Zero-width lookahead so overlapping keywords (e.g. "oauth"/"auth") are all reported in one scan.
+    alternation = "|".join(re.escape(kw) for kw in sorted(keyword_topics, key=len, reverse=True))
+    return re.compile(f"(?=({alternation}))"), keyword_topics
+
+
+_TOPIC_RE, _KEYWORD_TOPICS = _build_topic_matcher()
+
+LLM_CACHE_SIZE = 512
+
+_LLM_CACHE: OrderedDict[tuple[str, str, str, str], str] = OrderedDict()
+_LLM_CACHE_LOCK = threading.Lock()
+
+# Opt-in (CBG_PROMPT_CACHE=1) cross-process LLM answer cache, matched by question similarity.
+DEFAULT_PROMPT_CACHE_PATH = ".codebasegpt/prompt_cache.sqlite"
+
+_PROMPT_CACHES: dict[str, PromptCache] = {}
+_PROMPT_CACHES_LOCK = threading.Lock()
+
+ANSWER_CACHE_SIZE = 256
+
+_ANSWER_CACHE: OrderedDict[tuple[object, ...], tuple[str, tuple[EvidenceItem, ...], list[list[str]], bool]] = OrderedDict()
+_ANSWER_CACHE_LOCK = threading.Lock()
+
+LLM_TIMEOUT_SECONDS = 45
+DEFAULT_LLM_API_URL = "https://api.openai.com/v1/chat/completions"
 
-@dataclass
+# Keep-alive connections to the LLM API, one set per thread (http.client is not thread-safe).
+_HTTP_LOCAL = threading.local()
+
+
+@dataclass(slots=True, frozen=True)
 class EvidenceItem:
+    # Field order matches the column order of the evidence SELECTs in _collect_evidence.
     path: str
     symbol: str
     kind: str
@@ -43,125 +153,111 @@ class EvidenceItem:
     lineno: int | None
 
 
-def _extract_terms(question: str) -> list[str]:
+@functools.lru_cache(maxsize=2048)
+def _extract_terms(question: str) -> tuple[str, ...]:
     q = question.lower()
-    terms: list[str] = []
-
-    for topic, keywords in QUESTION_PATTERNS.items():
-        if any(kw in q for kw in keywords):
-            terms.append(topic)
-            terms.extend(keywords)
+    found = {topic for m in _TOPIC_RE.finditer(q) for topic in _KEYWORD_TOPICS[m.group(1)]}
+    # dict.fromkeys dedupes in first-seen order; topic names and their keywords
+    # come first, then question tokens.
+    terms = dict.fromkeys(
+        term
+        for topic, keywords in QUESTION_PATTERNS.items()
+        if topic in found
+        for term in (topic, *keywords)
+    )
+    for m in _TOKEN_RE.finditer(q):
+        token = m.group(0)
+        if token not in _STOPWORDS:
+            terms[token] = None
+            if len(terms) >= MAX_TERMS:
+                break
+    return tuple(terms)[:MAX_TERMS]
 
-    tokens = [t for t in re.findall(r"[a-zA-Z_][a-zA-Z0-9_]{2,}", q) if t not in STOPWORDS]
-    terms.extend(tokens)
 
-    deduped: list[str] = []
-    seen: set[str] = set()
-    for t in terms:
-        if t not in seen:
-            seen.add(t)
-            deduped.append(t)
-    return deduped[:10]
+def _collect_evidence(db_path: Path, question: str, limit: int = 40) -> tuple[EvidenceItem, ...]:
+    return _collect_evidence_cached(str(Path(db_path).resolve()), graph.db_fingerprint(db_path), question, limit)
 
 
-def _collect_evidence(db_path: Path, question: str, limit: int = 40) -> list[EvidenceItem]:
-    conn = graph.connect(db_path)
+@functools.lru_cache(maxsize=512)
+def _collect_evidence_cached(
+    db_path: str,
+    db_fingerprint: tuple[int, ...],
+    question: str,
+    limit: int,
+) -> tuple[EvidenceItem, ...]:
+    # db_fingerprint is only part of the cache key: a rebuilt index gets fresh entries.
+    # Plain tuples: columns are unpacked positionally into EvidenceItem, so the
+    # connection's sqlite3.Row factory would only add per-row overhead.
+    cur = graph.cached_connection(Path(db_path)).cursor()
+    cur.row_factory = None
     terms = _extract_terms(question)
 
     if not terms:
-        rows = conn.execute(
-            """
-            SELECT f.path, s.name AS symbol, s.kind, 'top' AS relation_type, s.lineno AS lineno
-            FROM symbols s
-            JOIN files f ON f.id = s.file_id
-            ORDER BY s.name
-            LIMIT ?
-            """,
-            (limit,),
-        ).fetchall()
+        rows = cur.execute(_LISTING_SQL, ("top", limit)).fetchall()
     else:
-        clauses = " OR ".join(
-            ["lower(s.name) LIKE ? OR lower(f.path) LIKE ? OR lower(COALESCE(r.dst_symbol_name, '')) LIKE ?" for _ in terms]
-        )
-        params: list[str | int] = []
+        params: list[str | int | None] = [graph.fts_query(terms)]
         for term in terms:
-            like = f"%{term}%"
-            params.extend([like, like, like])
-        params.append(limit * 3)
-
-        raw_rows = conn.execute(
-            f"""
-            SELECT f.path, s.name AS symbol, s.kind,
-                   COALESCE(r.relation_type, 'declares') AS relation_type,
-                   COALESCE(r.lineno, s.lineno) AS lineno
-            FROM symbols s
-            JOIN files f ON f.id = s.file_id
-            LEFT JOIN relations r ON r.dst_symbol_name = s.name
-            WHERE {clauses}
-            ORDER BY f.path
-            LIMIT ?
-            """,
-            tuple(params),
-        ).fetchall()
-
-        scored: list[tuple[int, object]] = []
-        for row in raw_rows:
-            hay = f"{row['symbol']} {row['path']} {row['relation_type']}".lower()
-            score = sum(2 if t in row["symbol"].lower() else 1 for t in terms if t in hay)
-            # boost relations that indicate flow
-            if row["relation_type"] in {"calls", "imports"}:
-                score += 2
-            scored.append((score, row))
-
-        scored.sort(key=lambda x: x[0], reverse=True)
-        rows = [row for _, row in scored[:limit]]
+            params.extend([term, term])
+        # Unused score slots get NULL: instr(x, NULL) is NULL, so the CASE scores 0.
+        params.extend([None, None] * (MAX_TERMS - len(terms)))
+        params.append(limit)
+        try:
+            rows = cur.execute(_EVIDENCE_SQL, params).fetchall()
+        except sqlite3.OperationalError as exc:
+            # Databases indexed before search_idx/name_lc existed; the read-only
+            # path cannot migrate them, so fall back to the LIKE scan.
+            if not str(exc).startswith("no such"):
+                raise
+            rows = _legacy_evidence_rows(cur, terms, limit)
 
     if not rows:
-        rows = conn.execute(
-            """
-            SELECT f.path, s.name AS symbol, s.kind, 'fallback' AS relation_type, s.lineno AS lineno
-            FROM symbols s
-            JOIN files f ON f.id = s.file_id
-            ORDER BY s.name
-            LIMIT ?
-            """,
-            (min(limit, 10),),
-        ).fetchall()
-
-    conn.close()
-    return [
-        EvidenceItem(
-            path=row["path"],
-            symbol=row["symbol"],
-            kind=row["kind"],
-            relation_type=row["relation_type"],
-            lineno=row["lineno"],
-        )
-        for row in rows
-    ]
+        rows = cur.execute(_LISTING_SQL, ("fallback", min(limit, 10))).fetchall()
 
-
-def _call_paths_for_evidence(db_path: Path, evidence: list[EvidenceItem], depth: int = 3) -> list[list[str]]:
-    conn = graph.connect(db_path)
-    try:
-        candidates = [e.symbol for e in evidence[:6] if e.kind in {"function", "class"}]
-        paths: list[list[str]] = []
-        for symbol in candidates:
-            paths.extend(graph.call_paths_to_symbol(conn, symbol, max_depth=depth, limit=4))
-        unique: list[list[str]] = []
-        seen: set[tuple[str, ...]] = set()
-        for p in paths:
-            key = tuple(p)
-            if key in seen:
-                continue
-            seen.add(key)
-            unique.append(p)
-        return unique[:8]
-    finally:
-        conn.close()
+    return tuple(itertools.starmap(EvidenceItem, rows))
 
 
-def _heuristic_answer(question: str, evidence: list[EvidenceItem], call_paths: list[list[str]] | None = None) -> str:
+def _legacy_evidence_rows(cur: sqlite3.Cursor, terms: Sequence[str], limit: int) -> list[tuple]:
+    clauses = " OR ".join(
+        ["lower(s.name) LIKE ? OR lower(f.path) LIKE ? OR lower(COALESCE(r.dst_symbol_name, '')) LIKE ?"] * len(terms)
+    )
+    params: list[str | int] = []
+    for term in terms:
+        like = f"%{term}%"
+        params.extend([like, like, like])
+    params.append(limit * 3)
+    raw_rows = cur.execute(_LEGACY_EVIDENCE_SQL.format(clauses=clauses), params).fetchall()
+
+    scored: list[tuple[int, tuple]] = []
+    for row in raw_rows:
+        path, symbol, _, relation_type, _ = row
+        symbol_lc = symbol.lower()
+        hay = f"{symbol_lc} {path.lower()} {relation_type}"
+        score = sum(2 if t in symbol_lc else 1 for t in terms if t in hay)
+        if relation_type in {"calls", "imports"}:
+            score += 2
+        scored.append((score, row))
+    scored.sort(key=lambda x: x[0], reverse=True)
+    return [row for _, row in scored[:limit]]
+
+
+def _call_paths_for_evidence(db_path: Path, evidence: Sequence[EvidenceItem], depth: int = 3) -> list[list[str]]:
+    conn = graph.cached_connection(db_path)
+    candidates = [e.symbol for e in evidence[:6] if e.kind in {"function", "class"}]
+    paths: list[list[str]] = []
+    for symbol in candidates:
+        paths.extend(graph.call_paths_to_symbol(conn, symbol, max_depth=depth, limit=4))
+    unique: list[list[str]] = []
+    seen: set[tuple[str, ...]] = set()
+    for p in paths:
+        key = tuple(p)
+        if key in seen:
+            continue
+        seen.add(key)
+        unique.append(p)
+    return unique[:8]
+
+
+def _heuristic_answer(question: str, evidence: Sequence[EvidenceItem], call_paths: list[list[str]] | None = None) -> str:
     if not evidence:
         return "No indexed evidence found. Run indexing first or refine your question."
 
@@ -179,55 +275,284 @@ def _heuristic_answer(question: str, evidence: list[EvidenceItem], call_paths: l
     return "\n".join(lines)
 
 
-def _llm_answer(question: str, evidence: list[EvidenceItem], model: str | None = None) -> str:
+def _http_route(url: str) -> tuple[tuple[object, ...], urllib.parse.SplitResult, urllib.parse.SplitResult | None]:
+    # Pool key, parsed URL and parsed proxy for url. http.client ignores the *_proxy
+    # environment variables, so resolve them here the way urllib does (no_proxy included).
+    import urllib.parse
+    import urllib.request
+
+    parts = urllib.parse.urlsplit(url)
+    proxy = urllib.request.getproxies().get(parts.scheme)
+    if proxy and urllib.request.proxy_bypass(parts.hostname or ""):
+        proxy = None
+    proxy_parts = urllib.parse.urlsplit(proxy if "://" in proxy else "http://" + proxy) if proxy else None
+    return (parts.scheme, parts.hostname, parts.port, proxy), parts, proxy_parts
+
+
+def _proxy_headers(proxy_parts: urllib.parse.SplitResult) -> dict[str, str]:
+    import base64
+    import urllib.parse
+
+    if not proxy_parts.username:
+        return {}
+    user = urllib.parse.unquote(proxy_parts.username)
+    password = urllib.parse.unquote(proxy_parts.password or "")
+    token = base64.b64encode(f"{user}:{password}".encode("utf-8")).decode("ascii")
+    return {"Proxy-Authorization": f"Basic {token}"}
+
+
+def _http_connection(url: str) -> tuple[http.client.HTTPConnection, str, dict[str, str], bool]:
+    """Pooled connection, request target, extra (proxy) headers and whether the connection is reused."""
+    # Deferred: only LLM mode needs the HTTP client stack.
+    import http.client
+
+    key, parts, proxy_parts = _http_route(url)
+    target = parts.path or "/"
+    if parts.query:
+        target += "?" + parts.query
+    extra_headers: dict[str, str] = {}
+    if proxy_parts is not None and parts.scheme != "https":
+        # Plain http goes to the proxy as an absolute-URI request, as urllib sends it.
+        target = f"{parts.scheme}://{parts.netloc}{target}"
+        extra_headers = _proxy_headers(proxy_parts)
+
+    pool: dict[tuple[object, ...], http.client.HTTPConnection] | None = getattr(_HTTP_LOCAL, "connections", None)
+    if pool is None:
+        pool = _HTTP_LOCAL.connections = {}
+
+    conn = pool.get(key)
+    if conn is not None:
+        return conn, target, extra_headers, True
+
+    if proxy_parts is None:
+        conn_cls = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        conn = conn_cls(parts.hostname or "", parts.port, timeout=LLM_TIMEOUT_SECONDS)
+    elif parts.scheme == "https":
+        # Tunnel through the proxy with CONNECT; TLS still runs end to end.
+        conn = http.client.HTTPSConnection(
+            proxy_parts.hostname or "", proxy_parts.port or 8080, timeout=LLM_TIMEOUT_SECONDS
+        )
+        conn.set_tunnel(parts.hostname or "", parts.port, headers=_proxy_headers(proxy_parts))
+    else:
+        conn = http.client.HTTPConnection(
+            proxy_parts.hostname or "", proxy_parts.port or 8080, timeout=LLM_TIMEOUT_SECONDS
+        )
+    pool[key] = conn
+    return conn, target, extra_headers, False
+
+
+def _drop_http_connection(url: str) -> None:
+    pool = getattr(_HTTP_LOCAL, "connections", {})
+    conn = pool.pop(_http_route(url)[0], None)
+    if conn is not None:
+        conn.close()
+
+
+def _post_json(url: str, payload: dict[str, object], headers: dict[str, str]) -> dict[str, object]:
+    import http.client
+
+    body = dumps_json(payload)
+    while True:
+        conn, target, proxy_headers, reused = _http_connection(url)
+        try:
+            conn.request("POST", target, body=body, headers={**headers, **proxy_headers})
+            resp = conn.getresponse()
+            data = resp.read()
+        except (http.client.HTTPException, OSError) as exc:
+            _drop_http_connection(url)
+            # Retry once on a fresh socket only when a reused keep-alive connection was
+            # closed by the server. Timeouts and other errors are not retried: the
+            # request may already have reached the API and been billed.
+            if reused and isinstance(exc, (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError)):
+                continue
+            raise
+        if resp.will_close:
+            _drop_http_connection(url)
+        if 300 <= resp.status < 400:
+            # Redirects are not followed: re-sending a POST elsewhere (or downgrading it
+            # to GET, as urllib did) is never what an API client wants.
+            location = resp.getheader("Location", "")
+            raise RuntimeError(f"LLM API redirected (HTTP {resp.status}) to {location!r}; set CBG_LLM_API_URL to it")
+        if resp.status >= 400:
+            raise RuntimeError(f"LLM API returned HTTP {resp.status}: {data[:200].decode('utf-8', 'replace')}")
+        return loads_json(data)
+
+
+_EVIDENCE_LINE = "- symbol={} kind={} relation={} file={} line={}".format
+
+_SYSTEM_PROMPT = (
+    "You are a codebase analysis assistant. Answer strictly from provided evidence. "
+    "State uncertainty explicitly if evidence is weak and avoid unsupported claims.\n"
+    "Respond with:\n1) direct answer\n2) key components and flow\n3) uncertainty notes"
+)
+
+
+def _llm_api_url() -> str:
+    return os.getenv("CBG_LLM_API_URL", DEFAULT_LLM_API_URL)
+
+
+def _telemetry_path() -> Path:
+    return Path(os.getenv("CBG_TELEMETRY_PATH", ".codebasegpt/queries.jsonl"))
+
+
+def _llm_usage_path() -> Path:
+    # Token usage gets its own file next to the query log, which keeps one record per query.
+    return _telemetry_path().with_name("llm_usage.jsonl")
+
+
+def _llm_answer(question: str, evidence: Sequence[EvidenceItem], model: str | None = None) -> str:
     api_key = os.getenv("CBG_LLM_API_KEY")
     if not api_key:
         raise RuntimeError("CBG_LLM_API_KEY is not set")
 
-    api_url = os.getenv("CBG_LLM_API_URL", "https://api.openai.com/v1/chat/completions")
+    api_url = _llm_api_url()
     model_name = model or os.getenv("CBG_LLM_MODEL", "gpt-4o-mini")
 
-    evidence_lines = [
-        f"- symbol={e.symbol} kind={e.kind} relation={e.relation_type} file={e.path} line={e.lineno}"
-        for e in evidence[:40]
-    ]
-    evidence_text = "\n".join(evidence_lines) if evidence_lines else "- no evidence found"
+    evidence_text = (
+        "\n".join(_EVIDENCE_LINE(e.symbol, e.kind, e.relation_type, e.path, e.lineno) for e in evidence[:40])
+        or "- no evidence found"
+    )
 
+    # Static instructions first, then evidence, then the question: providers with
+    # automatic prefix caching can reuse the shared leading tokens across calls.
     payload = {
         "model": model_name,
         "messages": [
-            {
-                "role": "system",
-                "content": (
-                    "You are a codebase analysis assistant. Answer strictly from provided evidence. "
-                    "State uncertainty explicitly if evidence is weak and avoid unsupported claims."
-                ),
-            },
-            {
-                "role": "user",
-                "content": (
-                    f"Question:\n{question}\n\n"
-                    f"Indexed evidence:\n{evidence_text}\n\n"
-                    "Respond with:\n1) direct answer\n2) key components and flow\n3) uncertainty notes"
-                ),
-            },
+            {"role": "system", "content": _SYSTEM_PROMPT},
+            {"role": "user", "content": f"Indexed evidence:\n{evidence_text}\n\nQuestion:\n{question}"},
         ],
         "temperature": 0.1,
     }
 
-    req = urllib.request.Request(
+    raw = _post_json(
         api_url,
-        data=json.dumps(payload).encode("utf-8"),
+        payload,
         headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
-        method="POST",
     )
 
-    with urllib.request.urlopen(req, timeout=45) as resp:
-        raw = json.loads(resp.read().decode("utf-8"))
+    try:
+        _log_llm_usage(model_name, raw.get("usage"))
+    except Exception:
+        pass  # usage telemetry is best-effort; the completion already succeeded
 
     return raw["choices"][0]["message"]["content"].strip()
 
 
+def _log_llm_usage(model_name: str, usage: object) -> None:
+    if not isinstance(usage, dict):
+        return
+    details = usage.get("prompt_tokens_details")
+    cached = details.get("cached_tokens", 0) if isinstance(details, dict) else 0
+    enqueue_jsonl(
+        _llm_usage_path(),
+        {
+            "model": model_name,
+            "prompt_tokens": usage.get("prompt_tokens"),
+            "cached_prompt_tokens": cached,
+            "completion_tokens": usage.get("completion_tokens"),
+        },
+    )
+
+
+def _normalize_question(question: str) -> str:
+    return " ".join(_WORD_RE.findall(question.lower()))
+
+
+def _evidence_fingerprint(evidence: Sequence[EvidenceItem]) -> str:
+    import hashlib
+
+    digest = hashlib.blake2b(digest_size=16)
+    for key in sorted((e.symbol, e.path, e.lineno or 0, e.kind, e.relation_type) for e in evidence[:40]):
+        digest.update(repr(key).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _cache_tokens(question: str) -> list[str]:
+    return [t for t in _TOKEN_RE.findall(question.lower()) if t not in _STOPWORDS]
+
+
+def _prompt_cache() -> PromptCache | None:
+    if os.getenv("CBG_PROMPT_CACHE", "0") != "1":
+        return None
+    # Deferred: the cache pulls in hashlib and its own sqlite store only when enabled.
+    from .prompt_cache import PromptCache
+
+    path = str(Path(os.getenv("CBG_PROMPT_CACHE_PATH", DEFAULT_PROMPT_CACHE_PATH)).resolve())
+    with _PROMPT_CACHES_LOCK:
+        cache = _PROMPT_CACHES.get(path)
+        if cache is None:
+            cache = _PROMPT_CACHES[path] = PromptCache(Path(path), tokenize=_cache_tokens)
+    return cache
+
+
+def _cached_llm_answer(question: str, evidence: Sequence[EvidenceItem], model: str | None = None) -> str:
+    """Serve repeated LLM questions over the same evidence from an in-process LRU, then the prompt cache."""
+    model_name = model or os.getenv("CBG_LLM_MODEL", "gpt-4o-mini")
+    api_url = _llm_api_url()
+    key = (_normalize_question(question), model_name, api_url, _evidence_fingerprint(evidence))
+
+    with _LLM_CACHE_LOCK:
+        cached = _LLM_CACHE.get(key)
+        if cached is not None:
+            _LLM_CACHE.move_to_end(key)
+            return cached
+
+    prompt_cache = _prompt_cache()
+    scope = "\n".join(key[1:])
+    answer = prompt_cache.get(scope, question) if prompt_cache is not None else None
+    if answer is None:
+        answer = _llm_answer(question, evidence, model=model_name)
+        if prompt_cache is not None:
+            prompt_cache.put(scope, question, answer)
+    with _LLM_CACHE_LOCK:
+        _LLM_CACHE[key] = answer
+        while len(_LLM_CACHE) > LLM_CACHE_SIZE:
+            _LLM_CACHE.popitem(last=False)
+    return answer
+
+
+def _retrieve_and_answer(
+    db_path: Path,
+    question: str,
+    use_llm: bool = False,
+    model: str | None = None,
+) -> tuple[str, tuple[EvidenceItem, ...], list[list[str]], bool]:
+    """Memoized retrieval + synthesis; returns (answer, evidence, call_paths, llm_failed).
+
+    Keyed on the index fingerprint so rebuilding the database invalidates entries.
+    Answers produced by an LLM failure fallback are not cached.
+    """
+    # Same endpoint identity as _cached_llm_answer: switching CBG_LLM_API_URL must miss.
+    resolved_model = (model or os.getenv("CBG_LLM_MODEL", "gpt-4o-mini")) if use_llm else None
+    api_url = _llm_api_url() if use_llm else None
+    key = (str(Path(db_path).resolve()), graph.db_fingerprint(db_path), question, use_llm, resolved_model, api_url)
+    with _ANSWER_CACHE_LOCK:
+        cached = _ANSWER_CACHE.get(key)
+        if cached is not None:
+            _ANSWER_CACHE.move_to_end(key)
+            return cached
+
+    evidence = _collect_evidence(db_path, question)
+    call_paths = _call_paths_for_evidence(db_path, evidence)
+    llm_failed = False
+    if use_llm:
+        try:
+            answer = _cached_llm_answer(question, evidence, model=model)
+        except Exception as exc:
+            answer = f"LLM call failed ({exc}).\n\n" + _heuristic_answer(question, evidence, call_paths=call_paths)
+            llm_failed = True
+    else:
+        answer = _heuristic_answer(question, evidence, call_paths=call_paths)
+
+    entry = (answer, evidence, call_paths, llm_failed)
+    if not llm_failed:
+        with _ANSWER_CACHE_LOCK:
+            _ANSWER_CACHE[key] = entry
+            while len(_ANSWER_CACHE) > ANSWER_CACHE_SIZE:
+                _ANSWER_CACHE.popitem(last=False)
+    return entry
+
+
 def answer_question_with_metadata(
     db_path: Path,
     question: str,
@@ -237,22 +562,14 @@ def answer_question_with_metadata(
 ) -> dict[str, object]:
     settings = guardrail_settings()
     flags = detect_policy_flags(question)
-    evidence = _collect_evidence(db_path, question)
-    call_paths = _call_paths_for_evidence(db_path, evidence)
+    answer, evidence, call_paths, llm_failed = _retrieve_and_answer(db_path, question, use_llm=use_llm, model=model)
     evidence_count = len(evidence)
 
     confidence = min(0.95, 0.25 + 0.05 * min(evidence_count, 10) + 0.03 * min(len(call_paths), 4))
     if use_llm:
         confidence = min(0.98, confidence + 0.08)
-
-    if use_llm:
-        try:
-            answer = _llm_answer(question, evidence, model=model)
-        except Exception as exc:
-            answer = f"LLM call failed ({exc}).\n\n" + _heuristic_answer(question, evidence, call_paths=call_paths)
-            confidence = max(0.3, confidence - 0.2)
-    else:
-        answer = _heuristic_answer(question, evidence, call_paths=call_paths)
+    if llm_failed:
+        confidence = max(0.3, confidence - 0.2)
 
     if flags:
         confidence = min(confidence, settings["flagged_max_confidence"])
@@ -274,16 +591,15 @@ def answer_question_with_metadata(
         "policy_flags": flags,
         "evidence_paths": evidence_paths,
         "owner_suggestions": owners,
-        "call_paths": call_paths,
+        "call_paths": [list(p) for p in call_paths],
         "next_actions": [
             "Escalate for human review" if needs_human else "Respond with cited components",
             "Inspect top evidence paths for confirmation",
         ],
     }
 
-    telemetry_path = Path(os.getenv("CBG_TELEMETRY_PATH", ".codebasegpt/queries.jsonl"))
-    append_jsonl(
-        telemetry_path,
+    enqueue_jsonl(
+        _telemetry_path(),
         {
             "question": question,
             "confidence": round(confidence, 3),
@@ -6,7 +6,7 @@ from . import graph
 
 
 def generate_architecture_doc(db_path: Path, out_path: Path) -> Path:
-    conn = graph.connect(db_path)
+    conn = graph.cached_connection(db_path)
     stats = graph.summary_stats(conn)
     top = list(graph.top_symbols(conn, limit=20))
 
@@ -30,5 +30,4 @@ def generate_architecture_doc(db_path: Path, out_path: Path) -> Path:
             )
 
     out_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
-    conn.close()
     return out_path
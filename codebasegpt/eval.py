@@ -1,13 +1,25 @@
 from __future__ import annotations
 
-import json
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from .ai import answer_question_with_metadata
+from .ops import loads_json
 
+# LLM calls are I/O-bound, so evaluation fans them out across threads by default.
+DEFAULT_LLM_WORKERS = 8
 
-def run_eval_suite(db_path: Path, dataset_path: Path, use_llm: bool = False, model: str | None = None) -> dict[str, object]:
-    cases = [json.loads(line) for line in dataset_path.read_text(encoding="utf-8").splitlines() if line.strip()]
+
+def run_eval_suite(
+    db_path: Path,
+    dataset_path: Path,
+    use_llm: bool = False,
+    model: str | None = None,
+    workers: int | None = None,
+) -> dict[str, object]:
+    # Stream the JSONL file as bytes; loads_json uses orjson when it is installed.
+    with dataset_path.open("rb") as fh:
+        cases = [loads_json(line) for line in fh if line.strip()]
     if not cases:
         return {"cases": 0, "avg_confidence": 0.0, "contains_rate": 0.0, "needs_human_rate": 0.0}
 
@@ -17,11 +29,22 @@ def run_eval_suite(db_path: Path, dataset_path: Path, use_llm: bool = False, mod
     exact_policy_hits = 0
     per_case: list[dict[str, object]] = []
 
-    for case in cases:
+    if workers is None:
+        workers = DEFAULT_LLM_WORKERS if use_llm else 1
+
+    def _ask(case: dict[str, object]) -> dict[str, object]:
+        return answer_question_with_metadata(db_path, str(case["question"]), use_llm=use_llm, model=model)
+
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            outputs = list(pool.map(_ask, cases))
+    else:
+        outputs = [_ask(case) for case in cases]
+
+    for case, out in zip(cases, outputs):
         question = case["question"]
         expected = [s.lower() for s in case.get("must_include", [])]
         expected_flags = sorted(case.get("expected_policy_flags", []))
-        out = answer_question_with_metadata(db_path, question, use_llm=use_llm, model=model)
         answer = str(out["answer"]).lower()
 
         contains_ok = all(token in answer for token in expected)
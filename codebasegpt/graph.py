@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import sqlite3
+import threading
+from collections import OrderedDict, deque
 from pathlib import Path
 from typing import Iterable, Optional
 
@@ -9,7 +11,11 @@ SCHEMA_SQL = """
 CREATE TABLE IF NOT EXISTS files (
     id INTEGER PRIMARY KEY,
     path TEXT UNIQUE NOT NULL,
-    language TEXT NOT NULL
+    language TEXT NOT NULL,
+    path_lc TEXT GENERATED ALWAYS AS (lower(path)) STORED,
+    mtime_ns INTEGER,
+    size INTEGER,
+    content_hash BLOB
 );
 
 CREATE TABLE IF NOT EXISTS symbols (
@@ -18,6 +24,7 @@ CREATE TABLE IF NOT EXISTS symbols (
     name TEXT NOT NULL,
     kind TEXT NOT NULL,
     lineno INTEGER,
+    name_lc TEXT GENERATED ALWAYS AS (lower(name)) STORED,
     UNIQUE(file_id, name, kind, lineno),
     FOREIGN KEY(file_id) REFERENCES files(id)
 );
@@ -34,38 +41,194 @@ CREATE TABLE IF NOT EXISTS relations (
 );
 
 CREATE INDEX IF NOT EXISTS idx_symbols_name ON symbols(name);
-CREATE INDEX IF NOT EXISTS idx_relations_dst ON relations(dst_symbol_name);
+-- Superseded by the composite index below, which also covers relation_type/lineno lookups.
+DROP INDEX IF EXISTS idx_relations_dst;
+CREATE INDEX IF NOT EXISTS idx_relations_dst_type ON relations(dst_symbol_name, relation_type, lineno);
+CREATE INDEX IF NOT EXISTS idx_relations_file ON relations(file_id);
+
+-- Trigram FTS over symbol names and paths; rowid mirrors symbols.id.
+CREATE VIRTUAL TABLE IF NOT EXISTS search_idx USING fts5(symbol, path, tokenize='trigram');
+
+-- Aggregates materialized by refresh_stats() at the end of each index run.
+CREATE TABLE IF NOT EXISTS symbol_stats (
+    symbol_id INTEGER PRIMARY KEY,
+    inbound_refs INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS index_stats (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    files INTEGER NOT NULL,
+    symbols INTEGER NOT NULL,
+    relations INTEGER NOT NULL
+);
 """
 
 
-def connect(db_path: Path) -> sqlite3.Connection:
-    conn = sqlite3.connect(db_path)
+# Connection-local tuning that is also valid on read-only connections.
+READ_PRAGMAS = (
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA busy_timeout=5000",
+)
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    *READ_PRAGMAS,
+)
+
+# Lowercased copies used by evidence scoring, added to databases created before they existed.
+GENERATED_COLUMNS = {
+    "files": ("path_lc", "lower(path)"),
+    "symbols": ("name_lc", "lower(name)"),
+}
+
+# Incremental-indexing signature columns, added to databases created before they existed.
+ADDED_COLUMNS = {
+    "files": (("mtime_ns", "INTEGER"), ("size", "INTEGER"), ("content_hash", "BLOB")),
+}
+
+# Per thread: WAL readers on separate connections never serialize on one handle.
+MAX_CACHED_CONNECTIONS = 8
+
+_LOCAL = threading.local()
+
+
+def _apply_pragmas(conn: sqlite3.Connection, pragmas: tuple[str, ...] = PRAGMAS) -> None:
+    for pragma in pragmas:
+        conn.execute(pragma)
+
+
+def connect(db_path: Path | str) -> sqlite3.Connection:
+    # "file:" URIs (e.g. file:name?mode=memory&cache=shared) and ":memory:" skip the filesystem.
+    conn = sqlite3.connect(db_path, uri=str(db_path).startswith("file:"))
+    conn.row_factory = sqlite3.Row
+    _apply_pragmas(conn)
+    return conn
+
+
+def cached_connection(db_path: Path) -> sqlite3.Connection:
+    """Return this thread's long-lived read-only connection to db_path; callers must not close it."""
+    path = Path(db_path).resolve()
+    key = str(path)
+    inode = path.stat().st_ino if path.exists() else 0
+    cache: OrderedDict[str, tuple[sqlite3.Connection, int]] | None = getattr(_LOCAL, "connections", None)
+    if cache is None:
+        cache = _LOCAL.connections = OrderedDict()
+
+    entry = cache.get(key)
+    if entry is not None:
+        conn, cached_inode = entry
+        if cached_inode == inode:
+            cache.move_to_end(key)
+            return conn
+        # The database file was replaced (e.g. a fresh temp dir reused the path).
+        del cache[key]
+        conn.close()
+
+    conn = sqlite3.connect(f"{path.as_uri()}?mode=ro", uri=True, isolation_level=None)
     conn.row_factory = sqlite3.Row
+    _apply_pragmas(conn, READ_PRAGMAS)
+    cache[key] = (conn, inode)
+    while len(cache) > MAX_CACHED_CONNECTIONS:
+        _, (stale, _) = cache.popitem(last=False)
+        stale.close()
     return conn
 
 
+def db_fingerprint(db_path: Path) -> tuple[int, ...]:
+    """Cheap change token for an index: stat of the database file and its WAL."""
+    parts: list[int] = []
+    for candidate in (Path(db_path), Path(f"{db_path}-wal")):
+        try:
+            st = candidate.stat()
+        except FileNotFoundError:
+            parts.extend((0, 0))
+        else:
+            parts.extend((st.st_mtime_ns, st.st_size))
+    return tuple(parts)
+
+
 def init_db(conn: sqlite3.Connection) -> None:
     conn.executescript(SCHEMA_SQL)
+    _migrate_generated_columns(conn)
+    _migrate_added_columns(conn)
     conn.commit()
 
 
+def _migrate_generated_columns(conn: sqlite3.Connection) -> None:
+    for table, (column, expr) in GENERATED_COLUMNS.items():
+        columns = {row["name"] for row in conn.execute(f"PRAGMA table_xinfo({table})")}
+        if column not in columns:
+            # ALTER TABLE can only add VIRTUAL generated columns; new databases get STORED ones.
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} TEXT GENERATED ALWAYS AS ({expr}) VIRTUAL")
+
+
+def _migrate_added_columns(conn: sqlite3.Connection) -> None:
+    for table, added in ADDED_COLUMNS.items():
+        columns = {row["name"] for row in conn.execute(f"PRAGMA table_xinfo({table})")}
+        for column, decl in added:
+            if column not in columns:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+
 def reset_repository(conn: sqlite3.Connection) -> None:
+    conn.execute("DELETE FROM index_stats")
+    conn.execute("DELETE FROM symbol_stats")
+    conn.execute("DELETE FROM search_idx")
     conn.execute("DELETE FROM relations")
     conn.execute("DELETE FROM symbols")
     conn.execute("DELETE FROM files")
     conn.commit()
 
 
-def upsert_file(conn: sqlite3.Connection, path: str, language: str) -> int:
+def upsert_file(
+    conn: sqlite3.Connection,
+    path: str,
+    language: str,
+    signature: tuple[int, int, bytes] | None = None,
+) -> int:
+    """Insert or update a file row; signature is (mtime_ns, size, content_hash)."""
+    mtime_ns, size, content_hash = signature or (None, None, None)
     conn.execute(
-        "INSERT OR IGNORE INTO files(path, language) VALUES (?, ?)",
-        (path, language),
+        """
+        INSERT INTO files(path, language, mtime_ns, size, content_hash) VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(path) DO UPDATE SET
+            language = excluded.language,
+            mtime_ns = excluded.mtime_ns,
+            size = excluded.size,
+            content_hash = excluded.content_hash
+        """,
+        (path, language, mtime_ns, size, content_hash),
     )
     row = conn.execute("SELECT id FROM files WHERE path = ?", (path,)).fetchone()
     assert row is not None
     return int(row["id"])
 
 
+def file_signatures(conn: sqlite3.Connection) -> dict[str, tuple[int, int | None, int | None, bytes | None]]:
+    """Map path -> (file_id, mtime_ns, size, content_hash) for every indexed file."""
+    return {
+        row[0]: (row[1], row[2], row[3], row[4])
+        for row in conn.execute("SELECT path, id, mtime_ns, size, content_hash FROM files")
+    }
+
+
+def touch_files(conn: sqlite3.Connection, rows: list[tuple[int, int, int]]) -> None:
+    """Record new (mtime_ns, size, file_id) for files whose content hash did not change."""
+    conn.executemany("UPDATE files SET mtime_ns = ?, size = ? WHERE id = ?", rows)
+
+
+def clear_files(conn: sqlite3.Connection, file_ids: list[int], drop: bool = False) -> None:
+    """Delete the symbols and relations of the given files, and the file rows too if drop is set."""
+    params = [(file_id,) for file_id in file_ids]
+    conn.executemany("DELETE FROM relations WHERE file_id = ?", params)
+    conn.executemany("DELETE FROM symbols WHERE file_id = ?", params)
+    if drop:
+        conn.executemany("DELETE FROM files WHERE id = ?", params)
+
+
 def insert_symbol(
     conn: sqlite3.Connection,
     file_id: int,
@@ -85,6 +248,22 @@ def insert_symbol(
     return int(row["id"])
 
 
+def insert_symbols_bulk(
+    conn: sqlite3.Connection,
+    file_id: int,
+    rows: list[tuple[str, str, Optional[int]]],
+) -> dict[str, int]:
+    """Insert (name, kind, lineno) rows for one file and return name -> id (last definition wins)."""
+    conn.executemany(
+        "INSERT OR IGNORE INTO symbols(file_id, name, kind, lineno) VALUES (?, ?, ?, ?)",
+        [(file_id, name, kind, lineno) for name, kind, lineno in rows],
+    )
+    return {
+        row["name"]: int(row["id"])
+        for row in conn.execute("SELECT id, name FROM symbols WHERE file_id = ? ORDER BY id", (file_id,))
+    }
+
+
 def insert_relation(
     conn: sqlite3.Connection,
     file_id: int,
@@ -102,42 +281,119 @@ def insert_relation(
     )
 
 
-def callers_of(conn: sqlite3.Connection, symbol_name: str) -> list[sqlite3.Row]:
-    return conn.execute(
+def insert_relations_bulk(
+    conn: sqlite3.Connection,
+    rows: list[tuple[Optional[int], str, str, int, Optional[int]]],
+) -> None:
+    """Insert (src_symbol_id, dst_symbol_name, relation_type, file_id, lineno) rows."""
+    conn.executemany(
         """
-        SELECT f.path, s.name as caller, r.lineno
-        FROM relations r
-        LEFT JOIN symbols s ON s.id = r.src_symbol_id
-        JOIN files f ON f.id = r.file_id
-        WHERE r.relation_type = 'calls' AND r.dst_symbol_name = ?
-        ORDER BY f.path, r.lineno
+        INSERT INTO relations(src_symbol_id, dst_symbol_name, relation_type, file_id, lineno)
+        VALUES (?, ?, ?, ?, ?)
         """,
-        (symbol_name,),
-    ).fetchall()
+        rows,
+    )
 
 
-def impacts_of(conn: sqlite3.Connection, symbol_name: str) -> list[sqlite3.Row]:
-    return conn.execute(
+def rebuild_search_index(conn: sqlite3.Connection) -> None:
+    conn.execute("DELETE FROM search_idx")
+    conn.execute(
         """
-        SELECT f.path, s.name as dependent, r.relation_type, r.lineno
-        FROM relations r
-        LEFT JOIN symbols s ON s.id = r.src_symbol_id
-        JOIN files f ON f.id = r.file_id
-        WHERE r.dst_symbol_name = ?
-        ORDER BY r.relation_type, f.path
-        """,
-        (symbol_name,),
-    ).fetchall()
+        INSERT INTO search_idx(rowid, symbol, path)
+        SELECT s.id, s.name, f.path
+        FROM symbols s
+        JOIN files f ON f.id = s.file_id
+        """
+    )
+
+
+_COUNTS_SQL = (
+    "SELECT (SELECT COUNT(*) FROM files), (SELECT COUNT(*) FROM symbols), (SELECT COUNT(*) FROM relations)"
+)
+
+
+def refresh_stats(conn: sqlite3.Connection) -> None:
+    conn.execute("DELETE FROM symbol_stats")
+    conn.execute(
+        """
+        INSERT INTO symbol_stats(symbol_id, inbound_refs)
+        SELECT s.id, COUNT(r.id)
+        FROM symbols s
+        LEFT JOIN relations r ON r.dst_symbol_name = s.name
+        GROUP BY s.id
+        """
+    )
+    conn.execute(f"INSERT OR REPLACE INTO index_stats(id, files, symbols, relations) SELECT 1, * FROM ({_COUNTS_SQL})")
+
+
+def fts_query(terms: Iterable[str]) -> str:
+    """Build an FTS5 MATCH expression that ORs each term as a quoted phrase."""
+    return " OR ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+# Hoisted so every call hands sqlite3 the identical string and hits the
+# connection's prepared-statement cache. Public query helpers (callers_of,
+# impacts_of, top_symbols) return sqlite3.Row; internal traversal helpers
+# read plain tuples through a cursor with row_factory=None.
+
+# Shared by callers_of (full rows) and the call-path walk (caller names only).
+_CALLERS_FROM = """
+FROM relations r
+LEFT JOIN symbols s ON s.id = r.src_symbol_id
+JOIN files f ON f.id = r.file_id
+WHERE r.relation_type = 'calls' AND r.dst_symbol_name = ?
+ORDER BY f.path, r.lineno
+"""
+
+_CALLERS_SQL = f"SELECT f.path, s.name as caller, r.lineno{_CALLERS_FROM}"
+
+_CALLER_NAMES_SQL = f"SELECT s.name{_CALLERS_FROM}"
+
+_IMPACTS_SQL = """
+SELECT f.path, s.name as dependent, r.relation_type, r.lineno
+FROM relations r
+LEFT JOIN symbols s ON s.id = r.src_symbol_id
+JOIN files f ON f.id = r.file_id
+WHERE r.dst_symbol_name = ?
+ORDER BY r.relation_type, f.path
+"""
+
+
+def callers_of(conn: sqlite3.Connection, symbol_name: str) -> list[sqlite3.Row]:
+    return conn.execute(_CALLERS_SQL, (symbol_name,)).fetchall()
+
+
+def impacts_of(conn: sqlite3.Connection, symbol_name: str) -> list[sqlite3.Row]:
+    return conn.execute(_IMPACTS_SQL, (symbol_name,)).fetchall()
+
+
+def _index_stats_row(conn: sqlite3.Connection) -> sqlite3.Row | None:
+    # None for databases indexed before refresh_stats existed; callers count live.
+    try:
+        return conn.execute("SELECT files, symbols, relations FROM index_stats WHERE id = 1").fetchone()
+    except sqlite3.OperationalError:
+        return None
 
 
 def summary_stats(conn: sqlite3.Connection) -> dict[str, int]:
-    files = conn.execute("SELECT COUNT(*) c FROM files").fetchone()["c"]
-    symbols = conn.execute("SELECT COUNT(*) c FROM symbols").fetchone()["c"]
-    relations = conn.execute("SELECT COUNT(*) c FROM relations").fetchone()["c"]
-    return {"files": files, "symbols": symbols, "relations": relations}
+    row = _index_stats_row(conn)
+    if row is None:
+        row = conn.execute(_COUNTS_SQL).fetchone()
+    return {"files": row[0], "symbols": row[1], "relations": row[2]}
 
 
 def top_symbols(conn: sqlite3.Connection, limit: int = 20) -> Iterable[sqlite3.Row]:
+    if _index_stats_row(conn) is not None:
+        return conn.execute(
+            """
+            SELECT s.name, s.kind, st.inbound_refs
+            FROM symbol_stats st
+            JOIN symbols s ON s.id = st.symbol_id
+            ORDER BY st.inbound_refs DESC, s.name ASC
+            LIMIT ?
+            """,
+            (limit,),
+        )
     return conn.execute(
         """
         SELECT s.name, s.kind, COUNT(r.id) AS inbound_refs
@@ -156,20 +412,23 @@ def call_paths_to_symbol(conn: sqlite3.Connection, symbol_name: str, max_depth:
     if max_depth < 1:
         return []
 
+    # Same caller order as callers_of, as bare names from tuple rows.
+    cur = conn.cursor()
+    cur.row_factory = None
+
     paths: list[list[str]] = []
-    queue: list[tuple[str, list[str], int]] = [(symbol_name, [symbol_name], 0)]
+    queue: deque[tuple[str, list[str], int]] = deque([(symbol_name, [symbol_name], 0)])
     seen: set[tuple[str, int]] = {(symbol_name, 0)}
 
     while queue and len(paths) < limit:
-        current, chain, depth = queue.pop(0)
-        callers = callers_of(conn, current)
+        current, chain, depth = queue.popleft()
+        callers = cur.execute(_CALLER_NAMES_SQL, (current,)).fetchall()
         if not callers:
             if len(chain) > 1:
                 paths.append(chain)
             continue
 
-        for row in callers:
-            caller = row["caller"]
+        for (caller,) in callers:
             if not caller or caller in chain:
                 continue
             next_chain = [caller] + chain
@@ -1,7 +1,12 @@
 from __future__ import annotations
 
 import ast
+import hashlib
+import os
 import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Iterator
@@ -17,15 +22,44 @@ SUPPORTED_SUFFIXES = {
     ".go": "go",
 }
 
+_IDENT = r"[A-Za-z_][A-Za-z0-9_]*"
+_JS_DEF_RE = re.compile(
+    rf"^[ \t]*(?:export[ \t]+)?(?:(?:async[ \t]+)?function[ \t]+(?P<fn>{_IDENT})|class[ \t]+(?P<cls>{_IDENT}))",
+    re.MULTILINE,
+)
+# Anchored at line start: the lazy prefix stops at the first `from "..."` on a line, and
+# finditer resumes mid-line where ^ cannot match, so each line yields at most one import.
+_JS_IMPORT_RE = re.compile(r"^[^\n]*?from[ \t]+[\"'](?P<imp>[^\"'\n]+)[\"']", re.MULTILINE)
+
+# Line-anchored definition patterns, scanned over the whole buffer with finditer; the
+# named group that matched (fn/cls) gives the symbol kind. [ \t] keeps matches on one line.
+SOURCE_PATTERNS = {
+    "javascript": _JS_DEF_RE,
+    "typescript": _JS_DEF_RE,
+    "go": re.compile(
+        rf"^[ \t]*(?:func[ \t]+(?P<fn>{_IDENT})|type[ \t]+(?P<cls>{_IDENT})[ \t]+struct)",
+        re.MULTILINE,
+    ),
+    "rust": re.compile(
+        rf"^[ \t]*(?:pub[ \t]+)?(?:fn[ \t]+(?P<fn>{_IDENT})|struct[ \t]+(?P<cls>{_IDENT}))",
+        re.MULTILINE,
+    ),
+}
 
-@dataclass
+IMPORT_PATTERNS = {
+    "javascript": _JS_IMPORT_RE,
+    "typescript": _JS_IMPORT_RE,
+}
+
+
+@dataclass(frozen=True)
 class Symbol:
     name: str
     kind: str
     lineno: int | None
 
 
-@dataclass
+@dataclass(frozen=True)
 class Relation:
     dst_symbol_name: str
     relation_type: str
@@ -40,7 +74,11 @@ class FileIndexResult:
     relations: list[Relation] = field(default_factory=list)
 
 
-class PythonAnalyzer(ast.NodeVisitor):
+# Work-stack marker: closes the function/class scope opened before its children.
+_POP_SCOPE = object()
+
+
+class PythonAnalyzer:
     def __init__(self) -> None:
         self.symbols: list[Symbol] = []
         self.relations: list[Relation] = []
@@ -49,16 +87,30 @@ class PythonAnalyzer(ast.NodeVisitor):
     def _current_symbol(self) -> str | None:
         return self._stack[-1] if self._stack else None
 
-    def visit_FunctionDef(self, node: ast.FunctionDef) -> None:
+    def walk(self, tree: ast.AST) -> None:
+        # Explicit pre-order walk; avoids NodeVisitor's per-node getattr dispatch
+        # and generic_visit frames. Handlers return True when they open a scope.
+        handlers = self._HANDLERS
+        scopes = self._stack
+        work: list[object] = [tree]
+        while work:
+            node = work.pop()
+            if node is _POP_SCOPE:
+                scopes.pop()
+                continue
+            handler = handlers.get(type(node))
+            if handler is not None and handler(self, node):
+                work.append(_POP_SCOPE)
+            children = list(ast.iter_child_nodes(node))
+            children.reverse()
+            work.extend(children)
+
+    def _function(self, node: ast.FunctionDef | ast.AsyncFunctionDef) -> bool:
         self.symbols.append(Symbol(name=node.name, kind="function", lineno=node.lineno))
         self._stack.append(node.name)
-        self.generic_visit(node)
-        self._stack.pop()
-
-    def visit_AsyncFunctionDef(self, node: ast.AsyncFunctionDef) -> None:
-        self.visit_FunctionDef(node)
+        return True
 
-    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+    def _class(self, node: ast.ClassDef) -> bool:
         self.symbols.append(Symbol(name=node.name, kind="class", lineno=node.lineno))
         for base in node.bases:
             if isinstance(base, ast.Name):
@@ -71,10 +123,9 @@ class PythonAnalyzer(ast.NodeVisitor):
                     )
                 )
         self._stack.append(node.name)
-        self.generic_visit(node)
-        self._stack.pop()
+        return True
 
-    def visit_Import(self, node: ast.Import) -> None:
+    def _import(self, node: ast.Import) -> None:
         for alias in node.names:
             self.relations.append(
                 Relation(
@@ -85,7 +136,7 @@ class PythonAnalyzer(ast.NodeVisitor):
                 )
             )
 
-    def visit_ImportFrom(self, node: ast.ImportFrom) -> None:
+    def _import_from(self, node: ast.ImportFrom) -> None:
         module = node.module or ""
         for alias in node.names:
             full = f"{module}.{alias.name}" if module else alias.name
@@ -98,7 +149,7 @@ class PythonAnalyzer(ast.NodeVisitor):
                 )
             )
 
-    def visit_Call(self, node: ast.Call) -> None:
+    def _call(self, node: ast.Call) -> None:
         called_name = None
         if isinstance(node.func, ast.Name):
             called_name = node.func.id
@@ -114,19 +165,87 @@ class PythonAnalyzer(ast.NodeVisitor):
                     src_symbol_name=self._current_symbol(),
                 )
             )
-        self.generic_visit(node)
+
+    _HANDLERS = {
+        ast.FunctionDef: _function,
+        ast.AsyncFunctionDef: _function,
+        ast.ClassDef: _class,
+        ast.Import: _import,
+        ast.ImportFrom: _import_from,
+        ast.Call: _call,
+    }
+
+
+# Directory names never descended into (dot-directories are skipped as well).
+SKIP_DIRS = frozenset({"node_modules", "target", "dist"})
 
 
 def iter_source_files(root: Path) -> Iterator[Path]:
-    for path in root.rglob("*"):
-        if not path.is_file():
-            continue
-        if any(part.startswith(".") and part not in {".", ".."} for part in path.parts):
-            continue
-        if "node_modules" in path.parts or "target" in path.parts or "dist" in path.parts:
+    # scandir walk that prunes skipped directories before listing them and
+    # uses dirent types instead of a stat per entry. Sorted for stable ids.
+    pending = [str(root)]
+    while pending:
+        directory = pending.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
             continue
-        if path.suffix in SUPPORTED_SUFFIXES:
-            yield path
+        subdirs: list[str] = []
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in SKIP_DIRS:
+                    subdirs.append(entry.path)
+            elif os.path.splitext(entry.name)[1] in SUPPORTED_SUFFIXES and entry.is_file():
+                yield Path(entry.path)
+        pending.extend(reversed(subdirs))
+
+
+# Identical small sources (__init__.py boilerplate, generated stubs, re-runs in one
+# process) are parsed once; larger files bypass the cache to bound its memory.
+# Entries are keyed on a content digest so the cache never retains source text.
+PARSE_CACHE_SIZE = 4096
+PARSE_CACHE_MAX_CHARS = 64 * 1024
+
+_PARSE_CACHE: OrderedDict[bytes, tuple[tuple[Symbol, ...], tuple[Relation, ...]]] = OrderedDict()
+_PARSE_CACHE_LOCK = threading.Lock()
+
+
+def _analyze_python(content: str) -> tuple[tuple[Symbol, ...], tuple[Relation, ...]]:
+    try:
+        tree = ast.parse(content)
+    except Exception:
+        # Keep indexing resilient: even unparsable files are tracked.
+        return (), ()
+    analyzer = PythonAnalyzer()
+    analyzer.walk(tree)
+    return tuple(analyzer.symbols), tuple(analyzer.relations)
+
+
+def _analyze_python_cached(content: str) -> tuple[tuple[Symbol, ...], tuple[Relation, ...]]:
+    key = hashlib.blake2b(content.encode("utf-8"), digest_size=16).digest()
+    with _PARSE_CACHE_LOCK:
+        cached = _PARSE_CACHE.get(key)
+        if cached is not None:
+            _PARSE_CACHE.move_to_end(key)
+            return cached
+    result = _analyze_python(content)
+    with _PARSE_CACHE_LOCK:
+        _PARSE_CACHE[key] = result
+        if len(_PARSE_CACHE) > PARSE_CACHE_SIZE:
+            _PARSE_CACHE.popitem(last=False)
+    return result
+
+
+def _line_matches(pattern: re.Pattern[str], content: str) -> Iterator[tuple[int, re.Match[str]]]:
+    # Line numbers are counted incrementally between successive matches.
+    lineno, last = 1, 0
+    for m in pattern.finditer(content):
+        lineno += content.count("\n", last, m.start())
+        last = m.start()
+        yield lineno, m
 
 
 def analyze_file(path: Path) -> FileIndexResult:
@@ -139,78 +258,126 @@ def analyze_file(path: Path) -> FileIndexResult:
         return result
 
     if lang == "python":
-        try:
-            tree = ast.parse(content)
-            analyzer = PythonAnalyzer()
-            analyzer.visit(tree)
-            result.symbols.extend(analyzer.symbols)
-            result.relations.extend(analyzer.relations)
-        except Exception:
-            # Keep indexing resilient: even unreadable files are tracked.
-            pass
+        analyze = _analyze_python_cached if len(content) <= PARSE_CACHE_MAX_CHARS else _analyze_python
+        symbols, relations = analyze(content)
+        result.symbols.extend(symbols)
+        result.relations.extend(relations)
         return result
 
     # Lightweight cross-language extraction for Phase 1 parity improvements.
-    for lineno, line in enumerate(content.splitlines(), start=1):
-        stripped = line.strip()
-
-        if lang in {"javascript", "typescript"}:
-            m = re.match(r"(?:export\s+)?(?:async\s+)?function\s+([A-Za-z_][A-Za-z0-9_]*)", stripped)
-            if m:
-                result.symbols.append(Symbol(name=m.group(1), kind="function", lineno=lineno))
-            m = re.match(r"(?:export\s+)?class\s+([A-Za-z_][A-Za-z0-9_]*)", stripped)
-            if m:
-                result.symbols.append(Symbol(name=m.group(1), kind="class", lineno=lineno))
-            imp = re.search(r"from\s+[\"']([^\"']+)[\"']", stripped)
-            if imp:
-                result.relations.append(Relation(dst_symbol_name=imp.group(1), relation_type="imports", lineno=lineno))
-
-        elif lang == "go":
-            m = re.match(r"func\s+([A-Za-z_][A-Za-z0-9_]*)", stripped)
-            if m:
-                result.symbols.append(Symbol(name=m.group(1), kind="function", lineno=lineno))
-            m = re.match(r"type\s+([A-Za-z_][A-Za-z0-9_]*)\s+struct", stripped)
-            if m:
-                result.symbols.append(Symbol(name=m.group(1), kind="class", lineno=lineno))
-
-        elif lang == "rust":
-            m = re.match(r"(?:pub\s+)?fn\s+([A-Za-z_][A-Za-z0-9_]*)", stripped)
-            if m:
-                result.symbols.append(Symbol(name=m.group(1), kind="function", lineno=lineno))
-            m = re.match(r"(?:pub\s+)?struct\s+([A-Za-z_][A-Za-z0-9_]*)", stripped)
-            if m:
-                result.symbols.append(Symbol(name=m.group(1), kind="class", lineno=lineno))
+    for lineno, m in _line_matches(SOURCE_PATTERNS[lang], content):
+        group = m.lastgroup
+        result.symbols.append(Symbol(name=m[group], kind="function" if group == "fn" else "class", lineno=lineno))
+    if lang in IMPORT_PATTERNS:
+        for lineno, m in _line_matches(IMPORT_PATTERNS[lang], content):
+            result.relations.append(Relation(dst_symbol_name=m["imp"], relation_type="imports", lineno=lineno))
 
     return result
 
 
-def index_repository(repo_path: Path, db_path: Path, reset: bool = True) -> dict[str, int]:
+# Rows (files + symbols + relations) written per explicit transaction while indexing.
+INDEX_BATCH_ROWS = 10_000
+
+# Below this many files, process-pool startup costs more than serial parsing saves.
+PARALLEL_MIN_FILES = 64
+
+
+def _content_hash(path: Path) -> bytes:
+    return hashlib.blake2b(path.read_bytes(), digest_size=16).digest()
+
+
+def _analyze_files(paths: list[Path], workers: int) -> Iterator[FileIndexResult]:
+    """Yield analyze_file results in input order, parsing across processes for large repos."""
+    if workers > 1 and len(paths) >= PARALLEL_MIN_FILES:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            yield from pool.map(analyze_file, paths, chunksize=16)
+    else:
+        yield from map(analyze_file, paths)
+
+
+def index_repository(
+    repo_path: Path,
+    db_path: Path | str,
+    reset: bool = True,
+    batch_size: int = INDEX_BATCH_ROWS,
+    workers: int | None = None,
+) -> dict[str, int]:
     conn = graph.connect(db_path)
+    # Manage transactions explicitly so each batch is one BEGIN IMMEDIATE ... COMMIT.
+    conn.isolation_level = None
     graph.init_db(conn)
     if reset:
+        conn.execute("BEGIN IMMEDIATE")
         graph.reset_repository(conn)
 
+    # Without reset, files whose (mtime_ns, size) or content hash match the last run are skipped.
+    known = {} if reset else graph.file_signatures(conn)
+    seen: set[str] = set()
+    touched: list[tuple[int, int, int]] = []
+    changed: list[tuple[Path, str, tuple[int, int, bytes]]] = []
     for file_path in iter_source_files(repo_path):
         relative = str(file_path.relative_to(repo_path))
-        analysis = analyze_file(file_path)
-        file_id = graph.upsert_file(conn, relative, analysis.language)
-
-        symbol_map: dict[str, int] = {}
-        for symbol in analysis.symbols:
-            symbol_id = graph.insert_symbol(conn, file_id, symbol.name, symbol.kind, symbol.lineno)
-            symbol_map[symbol.name] = symbol_id
-
-        for relation in analysis.relations:
-            graph.insert_relation(
-                conn=conn,
-                file_id=file_id,
-                dst_symbol_name=relation.dst_symbol_name,
-                relation_type=relation.relation_type,
-                lineno=relation.lineno,
-                src_symbol_id=symbol_map.get(relation.src_symbol_name or ""),
+        try:
+            st = file_path.stat()
+            previous = known.get(relative)
+            if previous is not None and previous[1:3] == (st.st_mtime_ns, st.st_size):
+                seen.add(relative)
+                continue
+            digest = _content_hash(file_path)
+        except OSError:
+            continue
+        seen.add(relative)
+        if previous is not None and previous[3] == digest:
+            touched.append((st.st_mtime_ns, st.st_size, previous[0]))
+        else:
+            changed.append((file_path, relative, (st.st_mtime_ns, st.st_size, digest)))
+    removed = [entry[0] for path, entry in known.items() if path not in seen]
+    stale = [known[relative][0] for _, relative, _ in changed if relative in known]
+
+    if not (changed or removed or touched):
+        stats = graph.summary_stats(conn)
+        conn.close()
+        return stats
+
+    pending_relations: list[tuple[int | None, str, str, int, int | None]] = []
+    pending_rows = 0
+    paths = [file_path for file_path, _, _ in changed]
+    # Parsing fans out to worker processes; all SQLite writes stay on this connection.
+    analyses = _analyze_files(paths, workers if workers is not None else (os.cpu_count() or 1))
+    conn.execute("BEGIN IMMEDIATE")
+    graph.clear_files(conn, removed, drop=True)
+    graph.clear_files(conn, stale)
+    graph.touch_files(conn, touched)
+    for (_, relative, signature), analysis in zip(changed, analyses):
+        file_id = graph.upsert_file(conn, relative, analysis.language, signature)
+
+        symbol_map = graph.insert_symbols_bulk(
+            conn, file_id, [(symbol.name, symbol.kind, symbol.lineno) for symbol in analysis.symbols]
+        )
+
+        pending_relations.extend(
+            (
+                symbol_map.get(relation.src_symbol_name or ""),
+                relation.dst_symbol_name,
+                relation.relation_type,
+                file_id,
+                relation.lineno,
             )
-
-    conn.commit()
+            for relation in analysis.relations
+        )
+        pending_rows += 1 + len(analysis.symbols) + len(analysis.relations)
+        if pending_rows >= batch_size:
+            graph.insert_relations_bulk(conn, pending_relations)
+            conn.execute("COMMIT")
+            conn.execute("BEGIN IMMEDIATE")
+            pending_relations.clear()
+            pending_rows = 0
+
+    graph.insert_relations_bulk(conn, pending_relations)
+    if changed or removed:
+        graph.rebuild_search_index(conn)
+        graph.refresh_stats(conn)
+    conn.execute("COMMIT")
     stats = graph.summary_stats(conn)
     conn.close()
     return stats
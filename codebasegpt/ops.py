@@ -1,9 +1,19 @@
 from __future__ import annotations
 
+import atexit
+import functools
 import json
 import os
+import queue
 import re
+import threading
 from pathlib import Path
+from typing import Iterable, Sequence
+
+try:  # optional: faster JSON encode/decode on hot paths
+    import orjson
+except ImportError:  # pragma: no cover - depends on environment
+    orjson = None
 
 EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
 CARD_RE = re.compile(r"\b(?:\d[ -]*?){13,16}\b")
@@ -15,19 +25,46 @@ SENSITIVE_PATTERNS = {
 }
 
 
+# Single-pass matcher: the named group that matched identifies the PII kind.
+_PII_RE = re.compile(f"(?P<EMAIL>{EMAIL_RE.pattern})|(?P<CARD>{CARD_RE.pattern})")
+# One alternation per policy key: a shared alternation would let one key's match
+# consume characters another key's keyword needs ("breachargeback").
+_POLICY_RES = tuple(
+    (key, re.compile("|".join(map(re.escape, patterns)))) for key, patterns in SENSITIVE_PATTERNS.items()
+)
+
+
+def _pii_placeholder(match: re.Match[str]) -> str:
+    return f"[REDACTED_{match.lastgroup}]"
+
+
 def redact_pii(text: str) -> str:
-    text = EMAIL_RE.sub("[REDACTED_EMAIL]", text)
-    text = CARD_RE.sub("[REDACTED_CARD]", text)
-    return text
+    # The email branch backtracks over every word, so skip it when no "@" is present.
+    if "@" in text:
+        return _PII_RE.sub(_pii_placeholder, text)
+    return CARD_RE.sub("[REDACTED_CARD]", text)
+
+
+def redact_pii_batch(texts: Iterable[str]) -> list[str]:
+    """redact_pii over many strings, e.g. log lines streamed for ingestion."""
+    return list(map(redact_pii, texts))
 
 
 def detect_policy_flags(question: str) -> list[str]:
     q = question.lower()
-    flags: list[str] = []
-    for key, patterns in SENSITIVE_PATTERNS.items():
-        if any(p in q for p in patterns):
-            flags.append(key)
-    return flags
+    return [key for key, pattern in _POLICY_RES if pattern.search(q)]
+
+
+def dumps_json(payload: object, indent: bool = False) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(payload, indent=2 if indent else None).encode("utf-8")
+
+
+def loads_json(data: bytes | str) -> object:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
 
 
 def append_jsonl(path: Path, payload: dict[str, object]) -> None:
@@ -36,31 +73,140 @@ def append_jsonl(path: Path, payload: dict[str, object]) -> None:
         f.write(json.dumps(payload, ensure_ascii=False) + "\n")
 
 
-def load_codeowners(repo_path: Path) -> list[tuple[str, list[str]]]:
-    candidates = [repo_path / "CODEOWNERS", repo_path / ".github" / "CODEOWNERS", repo_path / "docs" / "CODEOWNERS"]
-    file = next((p for p in candidates if p.exists()), None)
-    if not file:
-        return []
+# Background JSONL writer: hot paths enqueue records and a daemon thread appends
+# them, opening each target file once per drained batch.
+JSONL_BATCH_SIZE = 100
+JSONL_EXIT_FLUSH_TIMEOUT_SECONDS = 5.0
+_JSONL_QUEUE: queue.Queue[tuple[Path, dict[str, object]]] = queue.Queue()
+_JSONL_WRITER: threading.Thread | None = None
+_JSONL_WRITER_LOCK = threading.Lock()
+
 
-    rules: list[tuple[str, list[str]]] = []
-    for line in file.read_text(encoding="utf-8").splitlines():
+def _drain_jsonl() -> None:
+    while True:
+        batch = [_JSONL_QUEUE.get()]
+        try:
+            while len(batch) < JSONL_BATCH_SIZE:
+                try:
+                    batch.append(_JSONL_QUEUE.get_nowait())
+                except queue.Empty:
+                    break
+            by_path: dict[Path, list[bytes]] = {}
+            for path, payload in batch:
+                try:
+                    line = dumps_json(payload) + b"\n"
+                except Exception:
+                    continue  # unserializable record: drop it, keep the rest
+                by_path.setdefault(path, []).append(line)
+            for path, lines in by_path.items():
+                try:
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    with path.open("ab") as f:
+                        f.write(b"".join(lines))
+                except OSError:
+                    pass  # telemetry is best-effort; never take down the writer
+        finally:
+            # Always settle the batch so flush_jsonl() (and the atexit flush) cannot hang.
+            for _ in batch:
+                _JSONL_QUEUE.task_done()
+
+
+def enqueue_jsonl(path: Path, payload: dict[str, object]) -> None:
+    global _JSONL_WRITER
+    if _JSONL_WRITER is None:
+        with _JSONL_WRITER_LOCK:
+            if _JSONL_WRITER is None:
+                _JSONL_WRITER = threading.Thread(target=_drain_jsonl, name="cbg-jsonl-writer", daemon=True)
+                _JSONL_WRITER.start()
+                atexit.register(flush_jsonl, JSONL_EXIT_FLUSH_TIMEOUT_SECONDS)
+    # Resolved now: a later chdir must not redirect records the writer has yet to drain.
+    _JSONL_QUEUE.put((Path(path).absolute(), payload))
+
+
+def flush_jsonl(timeout: float | None = None) -> bool:
+    """Block until every enqueued record has been written, or ``timeout`` expires.
+
+    Returns False if records were still pending when the timeout expired.
+    """
+    with _JSONL_QUEUE.all_tasks_done:
+        return _JSONL_QUEUE.all_tasks_done.wait_for(lambda: not _JSONL_QUEUE.unfinished_tasks, timeout)
+
+
+def load_codeowners(repo_path: Path) -> list[tuple[str, tuple[str, ...]]]:
+    for candidate in (repo_path / "CODEOWNERS", repo_path / ".github" / "CODEOWNERS", repo_path / "docs" / "CODEOWNERS"):
+        try:
+            mtime_ns = candidate.stat().st_mtime_ns
+        except OSError:
+            continue
+        return list(_parse_codeowners(str(candidate), mtime_ns))
+    return []
+
+
+@functools.lru_cache(maxsize=16)
+def _parse_codeowners(path: str, mtime_ns: int) -> tuple[tuple[str, tuple[str, ...]], ...]:
+    # mtime_ns is part of the cache key so an edited CODEOWNERS is re-read.
+    rules: list[tuple[str, tuple[str, ...]]] = []
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
         line = line.strip()
         if not line or line.startswith("#"):
             continue
         parts = line.split()
         if len(parts) < 2:
             continue
-        rules.append((parts[0], parts[1:]))
-    return rules
-
-
-def suggest_owners(paths: list[str], codeowners_rules: list[tuple[str, list[str]]]) -> list[str]:
+        rules.append((parts[0], tuple(parts[1:])))
+    return tuple(rules)
+
+
+def _codeowners_regex(pattern: str) -> re.Pattern[str]:
+    # gitignore-style: a leading or inner "/" anchors at the repo root; other
+    # patterns match at any depth. A match also covers everything beneath it,
+    # unless the last segment is a wildcard ("docs/*" owns only direct children).
+    directory = pattern.endswith("/")
+    body = pattern.rstrip("/")
+    anchored = body.startswith("/") or "/" in body
+    body = body.lstrip("/")
+    out: list[str] = []
+    i = 0
+    while i < len(body):
+        if body.startswith("**/", i) and i == 0:
+            out.append("(?:.*/)?")
+            i += 3
+        elif body.startswith("/**/", i):
+            out.append("/(?:.*/)?")
+            i += 4
+        elif body.startswith("**", i):
+            out.append(".*")
+            i += 2
+        else:
+            ch = body[i]
+            out.append("[^/]*" if ch == "*" else "[^/]" if ch == "?" else re.escape(ch))
+            i += 1
+    prefix = "" if anchored else "(?:.*/)?"
+    if directory:
+        suffix = "/.*"
+    elif any(ch in body.rpartition("/")[2] for ch in "*?"):
+        suffix = ""
+    else:
+        suffix = "(?:/.*)?"
+    return re.compile(prefix + "".join(out) + suffix + "$")
+
+
+@functools.lru_cache(maxsize=64)
+def _compiled_owner_rules(
+    rules: tuple[tuple[str, tuple[str, ...]], ...]
+) -> tuple[tuple[re.Pattern[str], tuple[str, ...]], ...]:
+    # Reversed so the first hit is CODEOWNERS' "last matching rule wins".
+    return tuple((_codeowners_regex(pattern), people) for pattern, people in reversed(rules))
+
+
+def suggest_owners(paths: list[str], codeowners_rules: Sequence[tuple[str, Sequence[str]]]) -> list[str]:
+    compiled = _compiled_owner_rules(tuple((pattern, tuple(people)) for pattern, people in codeowners_rules))
     owners: set[str] = set()
     for path in paths:
-        for pattern, people in codeowners_rules:
-            normalized = pattern.lstrip("/")
-            if normalized == "*" or path.startswith(normalized.rstrip("*")):
+        for regex, people in compiled:
+            if regex.match(path):
                 owners.update(people)
+                break
     return sorted(owners)
 
 
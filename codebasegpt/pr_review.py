@@ -21,7 +21,7 @@ def summarize_pr_impact(repo_path: Path, db_path: Path, base: str, head: str) ->
     if not changed:
         return "No file changes found between refs."
 
-    conn = graph.connect(db_path)
+    conn = graph.cached_connection(db_path)
     impacted = conn.execute(
         """
         SELECT DISTINCT r.dst_symbol_name as symbol
@@ -33,7 +33,6 @@ def summarize_pr_impact(repo_path: Path, db_path: Path, base: str, head: str) ->
         """.format(",".join("?" for _ in changed)),
         changed,
     ).fetchall()
-    conn.close()
 
     lines = ["# PR Impact Summary", "", "## Changed files"]
     lines.extend([f"- `{p}`" for p in changed])
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import hashlib
+import math
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Callable, Iterable
+
+# Hashed unigram + bigram embedding: stdlib-only, deterministic across processes.
+# Bigrams make the match order-sensitive, so "does a call b" and "does b call a"
+# (or "before capture" and "after capture") do not share an answer.
+EMBEDDING_DIM = 256
+DEFAULT_THRESHOLD = 0.85
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+
+_WORD_RE = re.compile(r"\w+")
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS prompt_cache (
+    id INTEGER PRIMARY KEY,
+    scope TEXT NOT NULL,
+    question TEXT NOT NULL,
+    embedding BLOB NOT NULL,
+    answer TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_prompt_cache_scope ON prompt_cache(scope, created_at);
+"""
+
+
+def _default_tokens(text: str) -> Iterable[str]:
+    return _WORD_RE.findall(text.lower())
+
+
+def _features(tokens: Iterable[str]) -> Iterable[str]:
+    prev = None
+    for token in tokens:
+        yield token
+        if prev is not None:
+            yield f"{prev} {token}"
+        prev = token
+
+
+def embed(tokens: Iterable[str], dim: int = EMBEDDING_DIM) -> array:
+    """Unit-length signed feature-hashing vector of the given tokens and their bigrams."""
+    vec = array("f", bytes(4 * dim))
+    for feature in _features(tokens):
+        h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+        vec[h % dim] += -1.0 if h >> 63 else 1.0
+    norm = math.sqrt(sum(v * v for v in vec))
+    if norm:
+        for i, v in enumerate(vec):
+            if v:
+                vec[i] = v / norm
+    return vec
+
+
+class PromptCache:
+    """Persistent answer cache matched by question similarity within a scope.
+
+    The scope (e.g. model + evidence fingerprint) must match exactly; only the
+    question wording is compared, by cosine similarity of hashed embeddings.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        threshold: float = DEFAULT_THRESHOLD,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        tokenize: Callable[[str], Iterable[str]] = _default_tokens,
+    ) -> None:
+        self.path = Path(path)
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self._tokenize = tokenize
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(SCHEMA_SQL)
+
+    def get(self, scope: str, question: str) -> str | None:
+        query = embed(self._tokenize(question))
+        if not any(query):
+            return None
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT embedding, answer FROM prompt_cache WHERE scope = ? AND created_at >= ?",
+                (scope, time.time() - self.ttl_seconds),
+            ).fetchall()
+
+        best_score, best_answer = self.threshold, None
+        for blob, answer in rows:
+            stored = array("f")
+            stored.frombytes(blob)
+            score = sum(a * b for a, b in zip(query, stored))
+            if score >= best_score:
+                best_score, best_answer = score, answer
+        return best_answer
+
+    def put(self, scope: str, question: str, answer: str) -> None:
+        vec = embed(self._tokenize(question))
+        if not any(vec):
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM prompt_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+            self._conn.execute(
+                "INSERT INTO prompt_cache(scope, question, embedding, answer, created_at) VALUES (?, ?, ?, ?, ?)",
+                (scope, question, vec.tobytes(), answer, now),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
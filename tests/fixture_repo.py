@@ -0,0 +1,48 @@
+"""Index-once repository shared by tests that only read from the graph."""
+
+import atexit
+import functools
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from codebasegpt.indexer import index_repository
+
+SOURCES = {
+    "auth_flow.py": "def authenticate_user(token):\n    return token is not None\n",
+    "auth.py": "def auth_login():\n    return True\n",
+    "checkout.py": "def checkout():\n    return True\n",
+    "refund.py": "def issue_refund():\n    return True\n",
+    "flow.py": "def leaf():\n    return True\n\ndef middle():\n    return leaf()\n\ndef entry():\n    return middle()\n",
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _scratch_dir() -> Path:
+    tmp_path = Path(tempfile.mkdtemp(prefix="cbg-tests-"))
+    atexit.register(shutil.rmtree, tmp_path, ignore_errors=True)
+    return tmp_path
+
+
+def isolated_env() -> "mock._patch":
+    # Keeps telemetry and cached LLM answers out of the working tree and makes
+    # LLM call counts independent of answers persisted by earlier runs.
+    return mock.patch.dict(
+        os.environ,
+        {"CBG_PROMPT_CACHE": "0", "CBG_TELEMETRY_PATH": str(_scratch_dir() / "queries.jsonl")},
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def shared_index_db() -> Path:
+    # Tests must not write to this database; copy it or index a private repo instead.
+    tmp_path = _scratch_dir()
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    for name, source in SOURCES.items():
+        (repo / name).write_text(source, encoding="utf-8")
+    db = tmp_path / "graph.sqlite"
+    index_repository(repo, db)
+    return db
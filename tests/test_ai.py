@@ -1,79 +1,258 @@
+import http.client
+import json
+import os
+import sqlite3
 import tempfile
+import threading
 import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 from unittest import mock
 
-from codebasegpt.ai import answer_question, answer_question_with_metadata
+from codebasegpt.ai import (
+    _drop_http_connection,
+    _http_connection,
+    _llm_answer,
+    _post_json,
+    answer_question,
+    answer_question_with_metadata,
+)
 from codebasegpt.indexer import index_repository
+from codebasegpt.ops import flush_jsonl
+from fixture_repo import isolated_env, shared_index_db
+
+_ENV = isolated_env()
+
+
+def setUpModule() -> None:
+    _ENV.start()
+
+
+def tearDownModule() -> None:
+    _ENV.stop()
 
 
 class AITests(unittest.TestCase):
     def test_heuristic_answer_contains_evidence(self) -> None:
-        with tempfile.TemporaryDirectory() as tmp:
-            tmp_path = Path(tmp)
-            repo = tmp_path / "repo"
-            repo.mkdir()
-            (repo / "auth_flow.py").write_text(
-                """
-
-def authenticate_user(token):
-    return token is not None
-""".strip(),
-                encoding="utf-8",
-            )
-            db = tmp_path / "graph.sqlite"
-            index_repository(repo, db)
-
-            text = answer_question(db, "Where does authentication happen?")
-            self.assertIn("Relevant components", text)
-            self.assertIn("authenticate_user", text)
+        text = answer_question(shared_index_db(), "Where does authentication happen?")
+        self.assertIn("Relevant components", text)
+        self.assertIn("authenticate_user", text)
 
     def test_call_paths_are_exposed_in_metadata(self) -> None:
+        meta = answer_question_with_metadata(shared_index_db(), "How does leaf work?")
+        self.assertIn("call_paths", meta)
+
+    def test_llm_failure_falls_back_to_heuristic(self) -> None:
+        with mock.patch("codebasegpt.ai._llm_answer", side_effect=RuntimeError("boom")):
+            text = answer_question(shared_index_db(), "How does checkout work?", use_llm=True)
+
+        self.assertIn("LLM call failed", text)
+        self.assertIn("Relevant components", text)
+
+    def test_repeated_llm_question_is_served_from_cache(self) -> None:
+        db = shared_index_db()
+        with mock.patch("codebasegpt.ai._llm_answer", return_value="Refunds go through issue_refund.") as llm:
+            first = answer_question(db, "How are refunds issued?", use_llm=True)
+            second = answer_question(db, "how are refunds  issued", use_llm=True)
+
+        self.assertEqual(first, second)
+        self.assertEqual(llm.call_count, 1)
+
+    def test_switching_llm_endpoint_misses_memoized_answers(self) -> None:
+        db = shared_index_db()
+        answer_question(db, "warm up")  # the first read creates the WAL file, changing the db fingerprint
+        with mock.patch("codebasegpt.ai._llm_answer", side_effect=["From endpoint A.", "From endpoint B."]) as llm:
+            with mock.patch.dict(os.environ, {"CBG_LLM_API_URL": "http://a.invalid/v1"}):
+                first = answer_question(db, "How is checkout routed?", use_llm=True)
+            with mock.patch.dict(os.environ, {"CBG_LLM_API_URL": "http://b.invalid/v1"}):
+                second = answer_question(db, "How is checkout routed?", use_llm=True)
+
+        self.assertEqual(llm.call_count, 2)
+        self.assertIn("endpoint A", first)
+        self.assertIn("endpoint B", second)
+
+    def test_reindex_invalidates_memoized_answers(self) -> None:
         with tempfile.TemporaryDirectory() as tmp:
             tmp_path = Path(tmp)
             repo = tmp_path / "repo"
             repo.mkdir()
-            (repo / "flow.py").write_text(
-                """
-
-def leaf():
-    return True
+            source = repo / "billing.py"
+            source.write_text("def charge_invoice():\n    return True\n", encoding="utf-8")
+            db = tmp_path / "graph.sqlite"
+            index_repository(repo, db)
 
-def middle():
-    return leaf()
+            self.assertIn("charge_invoice", answer_question(db, "How are invoices handled?"))
 
-def entry():
-    return middle()
-""".strip(),
-                encoding="utf-8",
-            )
-            db = tmp_path / "graph.sqlite"
+            source.write_text("def void_invoice():\n    return False\n", encoding="utf-8")
             index_repository(repo, db)
 
-            meta = answer_question_with_metadata(db, "How does leaf work?")
-            self.assertIn("call_paths", meta)
+            text = answer_question(db, "How are invoices handled?")
+            self.assertIn("void_invoice", text)
+            self.assertNotIn("charge_invoice", text)
 
-    def test_llm_failure_falls_back_to_heuristic(self) -> None:
+    def test_pre_fts_index_still_answers(self) -> None:
         with tempfile.TemporaryDirectory() as tmp:
             tmp_path = Path(tmp)
             repo = tmp_path / "repo"
             repo.mkdir()
-            (repo / "checkout.py").write_text(
-                """
-
-def checkout():
-    return True
-""".strip(),
-                encoding="utf-8",
-            )
+            (repo / "billing.py").write_text("def charge_invoice():\n    return True\n", encoding="utf-8")
             db = tmp_path / "graph.sqlite"
             index_repository(repo, db)
+            with sqlite3.connect(db) as conn:
+                conn.execute("DROP TABLE search_idx")
+                conn.execute("ALTER TABLE symbols DROP COLUMN name_lc")
+                conn.execute("ALTER TABLE files DROP COLUMN path_lc")
+
+            self.assertIn("charge_invoice", answer_question(db, "How are invoices charged?"))
+
+    def test_llm_prompt_puts_question_last_and_logs_cached_tokens(self) -> None:
+        response = {
+            "choices": [{"message": {"content": "ok"}}],
+            "usage": {"prompt_tokens": 900, "completion_tokens": 40, "prompt_tokens_details": {"cached_tokens": 768}},
+        }
+        with tempfile.TemporaryDirectory() as tmp:
+            telemetry = Path(tmp) / "queries.jsonl"
+            env = {"CBG_LLM_API_KEY": "test", "CBG_TELEMETRY_PATH": str(telemetry)}
+            with mock.patch.dict(os.environ, env), mock.patch(
+                "codebasegpt.ai._post_json", return_value=response
+            ) as post:
+                _llm_answer("Where is login?", [])
+                flush_jsonl()
+
+            messages = post.call_args.args[1]["messages"]
+            self.assertTrue(messages[-1]["content"].endswith("Question:\nWhere is login?"))
+            self.assertFalse(telemetry.exists())
+            record = json.loads((Path(tmp) / "llm_usage.jsonl").read_text(encoding="utf-8"))
+            self.assertEqual(record["prompt_tokens"], 900)
+            self.assertEqual(record["cached_prompt_tokens"], 768)
+
+    def test_malformed_usage_block_does_not_fail_the_answer(self) -> None:
+        for usage in ({"prompt_tokens": 5, "prompt_tokens_details": [1, 2]}, {"prompt_tokens_details": 3}, [1]):
+            response = {"choices": [{"message": {"content": " fine "}}], "usage": usage}
+            with self.subTest(usage=usage), mock.patch.dict(os.environ, {"CBG_LLM_API_KEY": "test"}), mock.patch(
+                "codebasegpt.ai._post_json", return_value=response
+            ):
+                self.assertEqual(_llm_answer("Where is login?", []), "fine")
+
+    def test_llm_requests_reuse_keep_alive_connection(self) -> None:
+        connections: list[object] = []
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self) -> None:
+                super().setup()
+                connections.append(self.client_address)
+
+            def do_POST(self) -> None:
+                self.rfile.read(int(self.headers["Content-Length"]))
+                body = json.dumps({"choices": [{"message": {"content": " ok "}}]}).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args: object) -> None:
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/v1/chat/completions"
+        try:
+            env = {"CBG_LLM_API_KEY": "test", "CBG_LLM_API_URL": url, "no_proxy": "127.0.0.1"}
+            with mock.patch.dict(os.environ, env):
+                self.assertEqual(_llm_answer("first question", []), "ok")
+                self.assertEqual(_llm_answer("second question", []), "ok")
+            self.assertEqual(len(connections), 1)
+        finally:
+            _drop_http_connection(url)
+            server.shutdown()
+            server.server_close()
+
+    def test_timeout_on_reused_connection_is_not_retried(self) -> None:
+        conn = mock.Mock()
+        conn.getresponse.side_effect = TimeoutError("timed out")
+        with mock.patch("codebasegpt.ai._http_connection", return_value=(conn, "/", {}, True)):
+            with self.assertRaises(TimeoutError):
+                _post_json("http://127.0.0.1:9/v1", {}, {})
+        self.assertEqual(conn.request.call_count, 1)
+
+    def test_https_proxy_is_tunnelled(self) -> None:
+        url = "https://api.example.com/v1/chat/completions"
+        env = {"https_proxy": "http://user:pw@proxy.internal:3128", "no_proxy": ""}
+        with mock.patch.dict(os.environ, env), mock.patch.object(http.client.HTTPSConnection, "set_tunnel") as tunnel:
+            try:
+                conn, target, extra_headers, reused = _http_connection(url)
+                self.assertEqual((conn.host, conn.port, target, reused), ("proxy.internal", 3128, "/v1/chat/completions", False))
+                self.assertEqual(extra_headers, {})
+                tunnel.assert_called_once_with(
+                    "api.example.com", None, headers={"Proxy-Authorization": "Basic dXNlcjpwdw=="}
+                )
+            finally:
+                _drop_http_connection(url)
+
+    def test_plain_http_goes_to_proxy_as_absolute_uri(self) -> None:
+        seen: list[tuple[str, str | None]] = []
+
+        class Proxy(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self) -> None:
+                self.rfile.read(int(self.headers["Content-Length"]))
+                seen.append((self.path, self.headers.get("Proxy-Authorization")))
+                body = json.dumps({"choices": [{"message": {"content": "via proxy"}}]}).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args: object) -> None:
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Proxy)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = "http://llm.internal:8000/v1/chat/completions"
+        env = {
+            "CBG_LLM_API_KEY": "test",
+            "CBG_LLM_API_URL": url,
+            "http_proxy": f"http://user:pw@127.0.0.1:{server.server_port}",
+            "no_proxy": "",
+        }
+        try:
+            with mock.patch.dict(os.environ, env):
+                self.assertEqual(_llm_answer("proxied question", []), "via proxy")
+                _drop_http_connection(url)
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertEqual(seen, [(url, "Basic dXNlcjpwdw==")])
+
+    def test_redirect_is_reported_not_followed(self) -> None:
+        class Redirect(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self) -> None:
+                self.rfile.read(int(self.headers["Content-Length"]))
+                self.send_response(308)
+                self.send_header("Location", "https://api.example.com/v2")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
 
-            with mock.patch("codebasegpt.ai._llm_answer", side_effect=RuntimeError("boom")):
-                text = answer_question(db, "How does checkout work?", use_llm=True)
+            def log_message(self, *args: object) -> None:
+                pass
 
-            self.assertIn("LLM call failed", text)
-            self.assertIn("Relevant components", text)
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Redirect)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/v1"
+        try:
+            with mock.patch.dict(os.environ, {"no_proxy": "127.0.0.1"}):
+                with self.assertRaisesRegex(RuntimeError, "redirected .*api.example.com/v2"):
+                    _post_json(url, {}, {})
+        finally:
+            _drop_http_connection(url)
+            server.shutdown()
+            server.server_close()
 
 
 if __name__ == "__main__":
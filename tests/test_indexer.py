@@ -1,9 +1,11 @@
 import tempfile
+import time
 import unittest
 from pathlib import Path
+from unittest import mock
 
 from codebasegpt.graph import callers_of, connect, impacts_of
-from codebasegpt.indexer import index_repository
+from codebasegpt.indexer import _PARSE_CACHE, analyze_file, index_repository
 
 
 class IndexerTests(unittest.TestCase):
@@ -25,12 +27,13 @@ def checkout():
                 encoding="utf-8",
             )
 
-            db = tmp_path / "graph.sqlite"
+            # Shared-cache in-memory database; `conn` keeps it alive across connections.
+            db = "file:test_index_and_queries?mode=memory&cache=shared"
+            conn = connect(db)
             stats = index_repository(repo, db)
             self.assertEqual(stats["files"], 1)
             self.assertGreaterEqual(stats["symbols"], 2)
 
-            conn = connect(db)
             rows = callers_of(conn, "helper")
             self.assertTrue(any(r["caller"] == "checkout" for r in rows))
 
@@ -38,6 +41,104 @@ def checkout():
             self.assertEqual(len(imports), 1)
             conn.close()
 
+    def test_parallel_parsing_matches_serial(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp_path = Path(tmp)
+            repo = tmp_path / "repo"
+            repo.mkdir()
+            for i in range(4):
+                (repo / f"mod{i}.py").write_text(
+                    f"def f{i}():\n    return g{i}()\n\nclass C{i}(Base):\n    pass\n", encoding="utf-8"
+                )
+
+            query = "SELECT f.path, r.dst_symbol_name, r.relation_type FROM relations r JOIN files f ON f.id = r.file_id ORDER BY 1, 2"
+            snapshots = []
+            for workers in (1, 2):
+                db = f"file:test_parallel_{workers}?mode=memory&cache=shared"
+                conn = connect(db)
+                with mock.patch("codebasegpt.indexer.PARALLEL_MIN_FILES", 1):
+                    stats = index_repository(repo, db, workers=workers)
+                snapshots.append((stats, [tuple(row) for row in conn.execute(query)]))
+                conn.close()
+
+            self.assertEqual(snapshots[0], snapshots[1])
+            self.assertEqual(snapshots[0][0]["files"], 4)
+
+    def test_incremental_reindex_only_touches_changed_files(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            repo = Path(tmp)
+            (repo / "keep.py").write_text("def kept():\n    return used()\n", encoding="utf-8")
+            (repo / "edit.py").write_text("def before():\n    return 1\n", encoding="utf-8")
+            (repo / "gone.py").write_text("def removed():\n    return 2\n", encoding="utf-8")
+
+            db = "file:test_incremental?mode=memory&cache=shared"
+            conn = connect(db)
+            index_repository(repo, db)
+
+            def symbol_ids() -> dict[str, int]:
+                return {row["name"]: row["id"] for row in conn.execute("SELECT id, name FROM symbols")}
+
+            kept_id = symbol_ids()["kept"]
+
+            self.assertEqual(index_repository(repo, db, reset=False)["relations"], 1)
+
+            (repo / "edit.py").write_text("def after():\n    return kept()\n", encoding="utf-8")
+            (repo / "gone.py").unlink()
+            (repo / "new.py").write_text("def added():\n    return 3\n", encoding="utf-8")
+            stats = index_repository(repo, db, reset=False)
+
+            self.assertEqual(stats, {"files": 3, "symbols": 3, "relations": 2})
+            self.assertEqual(set(symbol_ids()), {"kept", "after", "added"})
+            self.assertEqual(symbol_ids()["kept"], kept_id)
+            self.assertEqual([r["caller"] for r in callers_of(conn, "kept")], ["after"])
+            conn.close()
+
+    def test_regex_languages(self) -> None:
+        sources = {
+            "app.ts": (
+                "import x from 'lib/x'\n"
+                "  export async function load() {}\n"
+                "export class Store {}\n"
+                "import a from \"a\"; import b from \"b\"\n"
+            ),
+            "main.go": "package main\nfunc Run() {}\n  type Config struct {\n}\ntype Alias int\n",
+            "lib.rs": "pub fn start() {}\nstruct Inner;\n  pub struct Outer {}\n",
+        }
+        with tempfile.TemporaryDirectory() as tmp:
+            results = {}
+            for name, source in sources.items():
+                path = Path(tmp) / name
+                path.write_text(source, encoding="utf-8")
+                result = analyze_file(path)
+                results[name] = (
+                    [(s.name, s.kind, s.lineno) for s in result.symbols],
+                    [(r.dst_symbol_name, r.lineno) for r in result.relations],
+                )
+
+        self.assertEqual(results["app.ts"], ([("load", "function", 2), ("Store", "class", 3)], [("lib/x", 1), ("a", 4)]))
+        self.assertEqual(results["main.go"], ([("Run", "function", 2), ("Config", "class", 3)], []))
+        self.assertEqual(
+            results["lib.rs"], ([("start", "function", 1), ("Inner", "class", 2), ("Outer", "class", 3)], [])
+        )
+
+    def test_long_single_line_js_scans_in_linear_time(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "bundle.min.js"
+            path.write_text("var a=1;" * 128 * 1024 + "import z from 'tail'\n", encoding="utf-8")
+            started = time.perf_counter()
+            result = analyze_file(path)
+            self.assertLess(time.perf_counter() - started, 2.0)
+        self.assertEqual([(r.dst_symbol_name, r.lineno) for r in result.relations], [("tail", 1)])
+
+    def test_parse_cache_is_keyed_on_digest(self) -> None:
+        source = "def cached_twice():\n    return helper()\n"
+        with tempfile.TemporaryDirectory() as tmp:
+            first, second = Path(tmp) / "a.py", Path(tmp) / "b.py"
+            first.write_text(source, encoding="utf-8")
+            second.write_text(source, encoding="utf-8")
+            self.assertEqual(analyze_file(first), analyze_file(second))
+        self.assertFalse(any(isinstance(key, str) for key in _PARSE_CACHE))
+
 
 if __name__ == "__main__":
     unittest.main()
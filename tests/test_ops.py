@@ -2,10 +2,32 @@ import os
 import tempfile
 import unittest
 from pathlib import Path
+from unittest import mock
 
 from codebasegpt.ai import answer_question_with_metadata
-from codebasegpt.indexer import index_repository
-from codebasegpt.ops import guardrail_settings, redact_pii
+from codebasegpt.ops import (
+    detect_policy_flags,
+    enqueue_jsonl,
+    flush_jsonl,
+    guardrail_settings,
+    load_codeowners,
+    loads_json,
+    redact_pii,
+    redact_pii_batch,
+    suggest_owners,
+)
+from fixture_repo import isolated_env, shared_index_db
+
+
+_ENV = isolated_env()
+
+
+def setUpModule() -> None:
+    _ENV.start()
+
+
+def tearDownModule() -> None:
+    _ENV.stop()
 
 
 class OpsTests(unittest.TestCase):
@@ -15,30 +37,86 @@ class OpsTests(unittest.TestCase):
         self.assertIn("[REDACTED_EMAIL]", out)
         self.assertIn("[REDACTED_CARD]", out)
 
-    def test_guardrail_settings_env(self) -> None:
-        old = os.environ.get("CBG_MIN_CONFIDENCE")
-        os.environ["CBG_MIN_CONFIDENCE"] = "0.8"
-        try:
-            self.assertEqual(guardrail_settings()["min_confidence"], 0.8)
-        finally:
-            if old is None:
-                os.environ.pop("CBG_MIN_CONFIDENCE", None)
-            else:
-                os.environ["CBG_MIN_CONFIDENCE"] = old
+    def test_redaction_batch_matches_scalar(self) -> None:
+        texts = ["plain log line 200 OK", "card 4242-4242-4242-4242", "mail a@b.com card 4111111111111111", ""]
+        self.assertEqual(redact_pii_batch(texts), [redact_pii(t) for t in texts])
+        self.assertEqual(redact_pii_batch(texts)[1], "card [REDACTED_CARD]")
 
-    def test_policy_flags_and_metadata(self) -> None:
+    def test_suggest_owners_globs_and_last_match_wins(self) -> None:
+        rules = [
+            ("*", ["@everyone"]),
+            ("*.py", ["@py"]),
+            ("/src/", ["@src"]),
+            ("docs/**/*.md", ["@docs"]),
+            ("**/logs", ["@ops"]),
+            ("assets/*", ["@design"]),
+        ]
+        self.assertEqual(suggest_owners(["lib/util.py"], rules), ["@py"])
+        self.assertEqual(suggest_owners(["src/app/main.py"], rules), ["@src"])
+        self.assertEqual(suggest_owners(["docs/guide/intro.md"], rules), ["@docs"])
+        self.assertEqual(suggest_owners(["README.md", "lib/src/x.js"], rules), ["@everyone"])
+        self.assertEqual(suggest_owners(["logs/a.txt"], rules), ["@ops"])
+        self.assertEqual(suggest_owners(["srv/logs/b.txt"], rules), ["@ops"])
+        self.assertEqual(suggest_owners(["assets/logo.svg"], rules), ["@design"])
+        self.assertEqual(suggest_owners(["assets/icons/a.svg"], rules), ["@everyone"])
+
+    def test_load_codeowners_rereads_edited_file(self) -> None:
         with tempfile.TemporaryDirectory() as tmp:
-            tmp_path = Path(tmp)
-            repo = tmp_path / "repo"
-            repo.mkdir()
-            (repo / "auth.py").write_text("def auth_login():\n    return True\n", encoding="utf-8")
-            db = tmp_path / "graph.sqlite"
-            index_repository(repo, db)
+            repo = Path(tmp)
+            owners = repo / "CODEOWNERS"
+            owners.write_text("# comment\n*.py @py\n", encoding="utf-8")
+            self.assertEqual(load_codeowners(repo), [("*.py", ("@py",))])
 
-            meta = answer_question_with_metadata(db, "possible security breach in login flow")
-            self.assertIn("security", meta["policy_flags"])
-            self.assertTrue(meta["needs_human"])
+            owners.write_text("/src/ @src @lead\n", encoding="utf-8")
+            stat = owners.stat()
+            os.utime(owners, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+            self.assertEqual(load_codeowners(repo), [("/src/", ("@src", "@lead"))])
 
+    def test_enqueued_jsonl_records_are_written_in_order(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "nested" / "events.jsonl"
+            for i in range(250):
+                enqueue_jsonl(path, {"i": i, "note": "café"})
+            flush_jsonl()
+            records = [loads_json(line) for line in path.read_bytes().splitlines()]
+            self.assertEqual([r["i"] for r in records], list(range(250)))
+            self.assertEqual(records[0]["note"], "café")
+
+    def test_unserializable_jsonl_record_does_not_stall_writer(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "events.jsonl"
+            enqueue_jsonl(path, {"x": {1, 2}})
+            enqueue_jsonl(path, {"i": 1})
+            self.assertTrue(flush_jsonl(timeout=5))
+            enqueue_jsonl(path, {"i": 2})
+            self.assertTrue(flush_jsonl(timeout=5))
+            records = [loads_json(line) for line in path.read_bytes().splitlines()]
+            self.assertEqual(records, [{"i": 1}, {"i": 2}])
+
+    def test_relative_jsonl_path_is_fixed_at_enqueue_time(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            cwd = os.getcwd()
+            os.chdir(tmp)
+            try:
+                with mock.patch("codebasegpt.ops._JSONL_QUEUE.put") as put:
+                    enqueue_jsonl(Path("events.jsonl"), {"i": 1})
+            finally:
+                os.chdir(cwd)
+            self.assertEqual(put.call_args.args[0][0], Path(tmp).resolve() / "events.jsonl")
+
+    def test_policy_flags_report_overlapping_keywords(self) -> None:
+        self.assertEqual(detect_policy_flags("breachargeback"), ["security", "payments"])
+        self.assertEqual(detect_policy_flags("lawsuitoken leak"), ["security", "legal"])
+        self.assertEqual(detect_policy_flags("refund disputexploit"), ["security", "payments"])
+
+    def test_guardrail_settings_env(self) -> None:
+        with mock.patch.dict(os.environ, {"CBG_MIN_CONFIDENCE": "0.8"}):
+            self.assertEqual(guardrail_settings()["min_confidence"], 0.8)
+
+    def test_policy_flags_and_metadata(self) -> None:
+        meta = answer_question_with_metadata(shared_index_db(), "possible security breach in login flow")
+        self.assertIn("security", meta["policy_flags"])
+        self.assertTrue(meta["needs_human"])
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,82 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from codebasegpt import ai
+from codebasegpt.ai import answer_question
+from codebasegpt.prompt_cache import PromptCache
+from fixture_repo import isolated_env, shared_index_db
+
+_ENV = isolated_env()
+
+
+def setUpModule() -> None:
+    _ENV.start()
+
+
+def tearDownModule() -> None:
+    _ENV.stop()
+
+
+class PromptCacheTests(unittest.TestCase):
+    def test_similar_questions_hit_within_scope_only(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = PromptCache(Path(tmp) / "cache.sqlite")
+            cache.put("model-a", "Where are refunds issued?", "In issue_refund.")
+
+            self.assertEqual(cache.get("model-a", "where are REFUNDS issued"), "In issue_refund.")
+            self.assertIsNone(cache.get("model-b", "Where are refunds issued?"))
+            self.assertIsNone(cache.get("model-a", "How is checkout validated?"))
+            cache.close()
+
+    def test_word_order_changes_the_match(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = PromptCache(Path(tmp) / "cache.sqlite", tokenize=ai._cache_tokens)
+            cache.put("scope", "Does auth_login call checkout?", "Yes.")
+            cache.put("scope", "What happens before payment capture?", "Fraud checks.")
+
+            self.assertIsNone(cache.get("scope", "Does checkout call auth_login?"))
+            self.assertIsNone(cache.get("scope", "What happens after payment capture?"))
+            cache.close()
+
+    def test_disabled_unless_opted_in(self) -> None:
+        with mock.patch.dict(os.environ):
+            os.environ.pop("CBG_PROMPT_CACHE", None)
+            self.assertIsNone(ai._prompt_cache())
+
+    def test_entries_persist_and_expire(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "cache.sqlite"
+            writer = PromptCache(path)
+            writer.put("scope", "login token refresh", "See auth_login.")
+            writer.close()
+
+            reader = PromptCache(path)
+            self.assertEqual(reader.get("scope", "login token refresh"), "See auth_login.")
+            reader.close()
+
+            expired = PromptCache(path, ttl_seconds=0)
+            with mock.patch("codebasegpt.prompt_cache.time.time", return_value=10**10):
+                self.assertIsNone(expired.get("scope", "login token refresh"))
+            expired.close()
+
+    def test_rephrased_llm_question_skips_second_call(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = {"CBG_PROMPT_CACHE": "1", "CBG_PROMPT_CACHE_PATH": str(Path(tmp) / "cache.sqlite")}
+            with mock.patch.dict(os.environ, env), mock.patch(
+                "codebasegpt.ai._llm_answer", return_value="Refunds go through issue_refund."
+            ) as llm:
+                first = answer_question(shared_index_db(), "Where are refunds issued in checkout?", use_llm=True)
+                second = answer_question(shared_index_db(), "In checkout, where are refunds issued?", use_llm=True)
+                for cache in ai._PROMPT_CACHES.values():
+                    cache.close()
+                ai._PROMPT_CACHES.clear()
+
+            self.assertEqual(first, second)
+            self.assertEqual(llm.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()